@@ -2,17 +2,33 @@
 Accounts API - Full CRUD for cash accounts with balance tracking.
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from sqlmodel import Session, delete, select, update
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from datetime import datetime, timezone
 
 from core.database import get_session
-from core.queries import get_latest_account_balances
 from models import Account, BalanceSnapshot
 
+# Every route declares a response_model: FastAPI then serializes the result
+# straight to JSON bytes through pydantic-core, skipping jsonable_encoder.
 router = APIRouter(tags=["Accounts"])
 
+# Summary cache keyed by a version counter. Every write that touches accounts
+# or their balance snapshots bumps the version after committing, so a cached
+# summary is only ever served for the data it was computed from.
+_summary_version = 0
+_summary_cache: Dict[int, dict] = {}
+
+
+def invalidate_accounts_summary() -> None:
+    """Drop the cached accounts summary. Call after committing account writes."""
+    global _summary_version
+    _summary_version += 1
+    _summary_cache.clear()
+
 
 # Pydantic schemas
 class AccountCreate(BaseModel):
@@ -44,51 +60,85 @@ class AccountResponse(BaseModel):
     type: str
     currency: str
     tags: Optional[str]
-    current_balance: float
-    last_updated: Optional[datetime]
+    current_balance: float = 0.0
+    last_updated: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BalanceHistoryEntry(BaseModel):
+    date: datetime
+    amount: float
+    currency: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AccountDetailResponse(AccountResponse):
+    balance_history: List[BalanceHistoryEntry] = []
+
+
+# Built once at import; validates a whole row iterator in a single core call
+_account_list_adapter = TypeAdapter(List[AccountResponse])
+_balance_history_adapter = TypeAdapter(List[BalanceHistoryEntry])
+
+
+class TypeBalance(BaseModel):
+    type: str
+    balance: float
+
+
+class InstitutionBalance(BaseModel):
+    institution: str
+    balance: float
+
+
+class AccountsSummaryResponse(BaseModel):
+    total_balance: float
+    accounts_count: int
+    by_type: List[TypeBalance]
+    by_institution: List[InstitutionBalance]
+
+
+class BalanceUpdateResponse(BaseModel):
+    id: int
+    name: str
+    current_balance: float
+    last_updated: Optional[datetime]
+
+
+class AccountDeleteResponse(BaseModel):
+    message: str
+    id: int
+
+
+def _naive(value: datetime) -> datetime:
+    """Normalize to naive UTC so SQLite-loaded and request datetimes compare.
+
+    Aware values are converted before the offset is dropped; naive values
+    are taken to be UTC already.
+    """
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
 
 
 # Account CRUD
-@router.get("/accounts")
+@router.get("/accounts", response_model=List[AccountResponse])
 def list_accounts(session: Session = Depends(get_session)):
     """List all accounts with their current balances."""
-    accounts = session.exec(select(Account)).all()
-    latest_balances = get_latest_account_balances(session)
-
-    result = []
-    for account in accounts:
-        snap = latest_balances.get(account.id)
-        result.append({
-            "id": account.id,
-            "name": account.name,
-            "institution": account.institution,
-            "type": account.type,
-            "currency": account.currency,
-            "tags": account.tags,
-            "current_balance": snap.amount if snap else 0.0,
-            "last_updated": snap.date if snap else None,
-            "created_at": account.created_at,
-            "updated_at": account.updated_at,
-        })
-
-    return result
-
-
-@router.post("/accounts")
+    # Stream rows in batches and convert as we go, so only the response
+    # models (not a second list of ORM instances) are held at once.
+    rows = session.exec(
+        select(Account).order_by(Account.id).execution_options(yield_per=500)
+    )
+    return _account_list_adapter.validate_python(rows, from_attributes=True)
+
+
+@router.post("/accounts", response_model=AccountResponse)
 def create_account(data: AccountCreate, session: Session = Depends(get_session)):
     """Create a new account with initial balance."""
-    # Check for duplicate name
-    existing = session.exec(
-        select(Account).where(Account.name == data.name)
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Account with this name already exists")
-
+    now = datetime.now(timezone.utc)
     account = Account(
         name=data.name,
         institution=data.institution,
@@ -96,14 +146,21 @@ def create_account(data: AccountCreate, session: Session = Depends(get_session))
         currency=data.currency,
         tags=data.tags,
     )
+    if data.current_balance != 0:
+        account.current_balance = data.current_balance
+        account.last_updated = now
     session.add(account)
-    session.flush()  # Assigns account.id without committing
-    session.refresh(account)
+    try:
+        session.flush()  # Assigns account.id without committing
+    except IntegrityError:
+        # Account.name is UNIQUE; let the database detect duplicates
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Account with this name already exists")
 
     # Create initial balance snapshot
     if data.current_balance != 0:
         snapshot = BalanceSnapshot(
-            date=datetime.now(timezone.utc),
+            date=now,
             account_id=account.id,
             amount=data.current_balance,
             currency=data.currency,
@@ -111,164 +168,128 @@ def create_account(data: AccountCreate, session: Session = Depends(get_session))
         session.add(snapshot)
 
     session.commit()
+    invalidate_accounts_summary()
+    session.refresh(account)
 
-    return {
-        "id": account.id,
-        "name": account.name,
-        "institution": account.institution,
-        "type": account.type,
-        "currency": account.currency,
-        "tags": account.tags,
-        "current_balance": data.current_balance,
-        "last_updated": datetime.now(timezone.utc) if data.current_balance != 0 else None,
-        "created_at": account.created_at,
-        "updated_at": account.updated_at,
-    }
+    return account
 
 
-@router.get("/accounts/summary")
+@router.get("/accounts/summary", response_model=AccountsSummaryResponse)
 def get_accounts_summary(session: Session = Depends(get_session)):
     """Get aggregate summary of all accounts."""
-    accounts = session.exec(select(Account)).all()
-    latest_balances = get_latest_account_balances(session)
+    version = _summary_version
+    cached = _summary_cache.get(version)
+    if cached is not None:
+        return cached
+
+    # One scan grouped by (type, institution); the database does the per-row
+    # work and Python only folds the handful of resulting groups.
+    institution = func.coalesce(func.nullif(Account.institution, ""), "Other")
+    groups = session.exec(
+        select(
+            Account.type,
+            institution,
+            func.count(Account.id),
+            func.coalesce(func.sum(Account.current_balance), 0.0),
+        )
+        .group_by(Account.type, institution)
+        # Order by first account id so each key first appears in insertion order
+        .order_by(func.min(Account.id))
+    ).all()
 
+    accounts_count = 0
     total_balance = 0.0
-    by_type = {}
-    by_institution = {}
-
-    for account in accounts:
-        balance = latest_balances[account.id].amount if account.id in latest_balances else 0.0
+    by_type: Dict[str, float] = {}
+    by_institution: Dict[str, float] = {}
+    for account_type, account_institution, count, balance in groups:
+        accounts_count += count
         total_balance += balance
+        by_type[account_type] = by_type.get(account_type, 0.0) + balance
+        by_institution[account_institution] = by_institution.get(account_institution, 0.0) + balance
 
-        # Group by type
-        if account.type not in by_type:
-            by_type[account.type] = 0.0
-        by_type[account.type] += balance
-
-        # Group by institution
-        inst = account.institution or "Other"
-        if inst not in by_institution:
-            by_institution[inst] = 0.0
-        by_institution[inst] += balance
-
-    return {
+    summary = {
         "total_balance": total_balance,
-        "accounts_count": len(accounts),
+        "accounts_count": accounts_count,
         "by_type": [{"type": k, "balance": v} for k, v in by_type.items()],
         "by_institution": [{"institution": k, "balance": v} for k, v in by_institution.items()],
     }
+    _summary_cache[version] = summary
+    return summary
 
 
-@router.get("/accounts/{account_id}")
+@router.get("/accounts/{account_id}", response_model=AccountDetailResponse)
 def get_account(account_id: int, session: Session = Depends(get_session)):
     """Get account details with balance history."""
     account = session.get(Account, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    # Get all balance snapshots
+    # Last 30 balance snapshots (served by ix_balancesnapshot_account_latest)
     snapshots = session.exec(
         select(BalanceSnapshot)
         .where(BalanceSnapshot.account_id == account_id)
         .order_by(BalanceSnapshot.date.desc())
+        .limit(30)
     ).all()
 
-    current_balance = snapshots[0].amount if snapshots else 0.0
-    last_updated = snapshots[0].date if snapshots else None
+    return AccountDetailResponse.model_validate(account).model_copy(update={
+        "balance_history": _balance_history_adapter.validate_python(
+            snapshots, from_attributes=True
+        ),
+    })
 
-    return {
-        "id": account.id,
-        "name": account.name,
-        "institution": account.institution,
-        "type": account.type,
-        "currency": account.currency,
-        "tags": account.tags,
-        "current_balance": current_balance,
-        "last_updated": last_updated,
-        "created_at": account.created_at,
-        "updated_at": account.updated_at,
-        "balance_history": [
-            {"date": s.date, "amount": s.amount, "currency": s.currency}
-            for s in snapshots[:30]  # Last 30 entries
-        ],
-    }
 
-
-@router.put("/accounts/{account_id}")
+@router.put("/accounts/{account_id}", response_model=AccountResponse)
 def update_account(
     account_id: int,
     data: AccountUpdate,
     session: Session = Depends(get_session)
 ):
     """Update account details (not balance)."""
-    account = session.get(Account, account_id)
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    if data.name is not None:
-        # Check for duplicate name
-        existing = session.exec(
-            select(Account).where(Account.name == data.name, Account.id != account_id)
-        ).first()
-        if existing:
-            raise HTTPException(status_code=400, detail="Account with this name already exists")
-        account.name = data.name
-    if data.institution is not None:
-        account.institution = data.institution
-    if data.type is not None:
-        account.type = data.type
-    if data.currency is not None:
-        account.currency = data.currency
-    if data.tags is not None:
-        account.tags = data.tags
-
-    account.updated_at = datetime.now(timezone.utc)
-    session.add(account)
-    session.commit()
-    session.refresh(account)
-
-    # Get current balance
-    latest_snapshot = session.exec(
-        select(BalanceSnapshot)
-        .where(BalanceSnapshot.account_id == account_id)
-        .order_by(BalanceSnapshot.date.desc())
-    ).first()
+    patch = data.model_dump(exclude_none=True)
+    patch["updated_at"] = datetime.now(timezone.utc)
+
+    # UPDATE ... RETURNING writes and reads back the row in one statement
+    try:
+        account = session.exec(
+            update(Account)
+            .where(Account.id == account_id)
+            .values(**patch)
+            .returning(Account)
+        ).scalar_one_or_none()
+        if account is None:
+            raise HTTPException(status_code=404, detail="Account not found")
+        # Build the response before commit expires the returned row
+        response = AccountResponse.model_validate(account)
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Account with this name already exists")
+    invalidate_accounts_summary()
 
-    return {
-        "id": account.id,
-        "name": account.name,
-        "institution": account.institution,
-        "type": account.type,
-        "currency": account.currency,
-        "tags": account.tags,
-        "current_balance": latest_snapshot.amount if latest_snapshot else 0.0,
-        "last_updated": latest_snapshot.date if latest_snapshot else None,
-        "created_at": account.created_at,
-        "updated_at": account.updated_at,
-    }
+    return response
 
 
-@router.delete("/accounts/{account_id}")
+@router.delete("/accounts/{account_id}", response_model=AccountDeleteResponse)
 def delete_account(account_id: int, session: Session = Depends(get_session)):
     """Delete account and all its balance history."""
     account = session.get(Account, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    # Delete all balance snapshots
-    snapshots = session.exec(
-        select(BalanceSnapshot).where(BalanceSnapshot.account_id == account_id)
-    ).all()
-    for snapshot in snapshots:
-        session.delete(snapshot)
+    # Delete all balance snapshots in a single statement
+    session.exec(
+        delete(BalanceSnapshot).where(BalanceSnapshot.account_id == account_id)
+    )
 
     session.delete(account)
     session.commit()
+    invalidate_accounts_summary()
     return {"message": "Account deleted", "id": account_id}
 
 
 # Balance updates
-@router.post("/accounts/{account_id}/balance")
+@router.post("/accounts/{account_id}/balance", response_model=BalanceUpdateResponse)
 def update_balance(
     account_id: int,
     data: BalanceUpdate,
@@ -279,25 +300,29 @@ def update_balance(
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
+    now = datetime.now(timezone.utc)
     snapshot = BalanceSnapshot(
-        date=data.date or datetime.now(timezone.utc),
+        date=_naive(data.date or now),
         account_id=account_id,
         amount=data.amount,
         currency=account.currency,
     )
     session.add(snapshot)
 
-    account.updated_at = datetime.now(timezone.utc)
-    session.add(account)
+    # Backdated snapshots are history only; keep the newest as current
+    if account.last_updated is None or snapshot.date >= _naive(account.last_updated):
+        account.current_balance = data.amount
+        account.last_updated = snapshot.date
+    account.updated_at = now
 
     session.commit()
-    session.refresh(snapshot)
+    invalidate_accounts_summary()
 
     return {
         "id": account.id,
         "name": account.name,
-        "current_balance": data.amount,
-        "last_updated": snapshot.date,
+        "current_balance": account.current_balance,
+        "last_updated": account.last_updated,
     }
 
 
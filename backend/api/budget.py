@@ -1,18 +1,65 @@
 """
 Budget API - CRUD for categories, transactions, subscriptions, and analytics.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
-from typing import List, Optional
-from pydantic import BaseModel
-from datetime import datetime, timedelta, timezone
-from collections import defaultdict
+import calendar
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel import Session, select, update
+from sqlalchemy import case, func, literal, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from typing import Dict, List, Optional
+from pydantic import AliasPath, BaseModel, ConfigDict, Field, TypeAdapter
+from datetime import datetime, timezone
 
 from core.database import get_session
+from core.queries import month_key, shift_month, table_etag
 from models import BudgetCategory, Transaction, Subscription, Account
 
 router = APIRouter(tags=["Budget"])
 
+# Category lookup cache TTL in seconds (10 minutes)
+_CATEGORY_CACHE_TTL = 600
+
+# In-memory cache: {version: {"categories": {id: {...}}, "fetched_at": float}}.
+# Category writes bump the version after committing; a read that started
+# before the bump never stores its result, so it cannot outlive the write.
+_category_version = 0
+_category_cache: Dict[int, dict] = {}
+
+
+def get_categories_cached(session: Session) -> Dict[int, dict]:
+    """Return {id: {name, icon, color, budget_limit, is_income}} for all categories.
+
+    Categories are small, rarely changed reference data, so the lookup is
+    kept in memory and refreshed after the TTL or an explicit invalidation.
+    """
+    version = _category_version
+    cached = _category_cache.get(version)
+    if cached and time.time() - cached["fetched_at"] < _CATEGORY_CACHE_TTL:
+        return cached["categories"]
+
+    categories = {
+        c.id: {
+            "name": c.name,
+            "icon": c.icon,
+            "color": c.color,
+            "budget_limit": c.budget_limit,
+            "is_income": c.is_income,
+        }
+        for c in session.exec(select(BudgetCategory)).all()
+    }
+    if version == _category_version:
+        _category_cache[version] = {"categories": categories, "fetched_at": time.time()}
+    return categories
+
+
+def invalidate_categories_cache() -> None:
+    """Drop the cached category lookup. Call after committing category writes."""
+    global _category_version
+    _category_version += 1
+    _category_cache.clear()
+
 
 # Default categories to seed
 DEFAULT_CATEGORIES = [
@@ -29,6 +76,18 @@ DEFAULT_CATEGORIES = [
 ]
 
 
+def seed_default_categories(session: Session) -> None:
+    """Insert DEFAULT_CATEGORIES if the category table is empty.
+
+    Run at startup and after a database reset rather than from a GET handler.
+    """
+    if session.exec(select(func.count(BudgetCategory.id))).one() > 0:
+        return
+    session.add_all([BudgetCategory(**cat_data) for cat_data in DEFAULT_CATEGORIES])
+    session.commit()
+    invalidate_categories_cache()
+
+
 # Pydantic schemas
 class CategoryCreate(BaseModel):
     name: str
@@ -88,25 +147,52 @@ class SubscriptionUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 
+class TransactionRead(BaseModel):
+    """Transaction as returned by the API, read straight off the ORM row.
+
+    Category/account display fields are pulled through the relationships, so
+    load them eagerly (selectinload/joinedload) when reading many rows.
+    """
+    id: int
+    date: datetime
+    description: str
+    amount: float
+    category_id: Optional[int]
+    category_name: Optional[str] = Field(default=None, validation_alias=AliasPath("category", "name"))
+    category_color: Optional[str] = Field(default=None, validation_alias=AliasPath("category", "color"))
+    account_id: Optional[int]
+    account_name: Optional[str] = Field(default=None, validation_alias=AliasPath("account", "name"))
+    is_recurring: bool
+    recurrence_frequency: Optional[str]
+    merchant: Optional[str]
+    notes: Optional[str]
+    ai_categorized: bool
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+_transaction_list_adapter = TypeAdapter(List[TransactionRead])
+
+
 # --- Category Endpoints ---
 
 @router.get("/budget/categories")
-def list_categories(session: Session = Depends(get_session)):
+def list_categories(
+    request: Request,
+    response: Response,
+    session: Session = Depends(get_session),
+):
     """List all budget categories."""
+    etag = table_etag(session, BudgetCategory)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     categories = session.exec(
         select(BudgetCategory).order_by(BudgetCategory.name)
     ).all()
 
-    # If no categories exist, seed default ones
-    if not categories:
-        for cat_data in DEFAULT_CATEGORIES:
-            cat = BudgetCategory(**cat_data)
-            session.add(cat)
-        session.commit()
-        categories = session.exec(
-            select(BudgetCategory).order_by(BudgetCategory.name)
-        ).all()
-
     return [
         {
             "id": cat.id,
@@ -123,12 +209,6 @@ def list_categories(session: Session = Depends(get_session)):
 @router.post("/budget/categories")
 def create_category(data: CategoryCreate, session: Session = Depends(get_session)):
     """Create a new budget category."""
-    existing = session.exec(
-        select(BudgetCategory).where(BudgetCategory.name == data.name)
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Category with this name already exists")
-
     category = BudgetCategory(
         name=data.name,
         icon=data.icon,
@@ -137,7 +217,13 @@ def create_category(data: CategoryCreate, session: Session = Depends(get_session
         is_income=data.is_income,
     )
     session.add(category)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        # BudgetCategory.name is UNIQUE; let the database detect duplicates
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Category with this name already exists")
+    invalidate_categories_cache()
     session.refresh(category)
 
     return {
@@ -162,14 +248,6 @@ def update_category(
         raise HTTPException(status_code=404, detail="Category not found")
 
     if data.name is not None:
-        existing = session.exec(
-            select(BudgetCategory).where(
-                BudgetCategory.name == data.name,
-                BudgetCategory.id != category_id
-            )
-        ).first()
-        if existing:
-            raise HTTPException(status_code=400, detail="Category with this name already exists")
         category.name = data.name
     if data.icon is not None:
         category.icon = data.icon
@@ -181,11 +259,8 @@ def update_category(
         category.is_income = data.is_income
 
     category.updated_at = datetime.now(timezone.utc)
-    session.add(category)
-    session.commit()
-    session.refresh(category)
-
-    return {
+    # Build the response now; commit expires the instance
+    response = {
         "id": category.id,
         "name": category.name,
         "icon": category.icon,
@@ -194,6 +269,15 @@ def update_category(
         "is_income": category.is_income,
     }
 
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Category with this name already exists")
+    invalidate_categories_cache()
+
+    return response
+
 
 @router.delete("/budget/categories/{category_id}")
 def delete_category(category_id: int, session: Session = Depends(get_session)):
@@ -202,22 +286,22 @@ def delete_category(category_id: int, session: Session = Depends(get_session)):
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
-    # Clear category from transactions
-    transactions = session.exec(
-        select(Transaction).where(Transaction.category_id == category_id)
-    ).all()
-    for txn in transactions:
-        txn.category_id = None
-        session.add(txn)
+    # Clear category from transactions in a single statement
+    session.exec(
+        update(Transaction)
+        .where(Transaction.category_id == category_id)
+        .values(category_id=None)
+    )
 
     session.delete(category)
     session.commit()
+    invalidate_categories_cache()
     return {"message": "Category deleted", "id": category_id}
 
 
 # --- Transaction Endpoints ---
 
-@router.get("/budget/transactions")
+@router.get("/budget/transactions", response_model=List[TransactionRead])
 def list_transactions(
     session: Session = Depends(get_session),
     start_date: Optional[datetime] = None,
@@ -228,7 +312,11 @@ def list_transactions(
     offset: int = 0,
 ):
     """List transactions with optional filters."""
-    query = select(Transaction).order_by(Transaction.date.desc())
+    query = (
+        select(Transaction)
+        .options(selectinload(Transaction.category), selectinload(Transaction.account))
+        .order_by(Transaction.date.desc())
+    )
 
     if start_date:
         query = query.where(Transaction.date >= start_date)
@@ -239,39 +327,17 @@ def list_transactions(
     if account_id:
         query = query.where(Transaction.account_id == account_id)
 
-    query = query.offset(offset).limit(limit)
-    transactions = session.exec(query).all()
+    query = query.offset(offset).limit(limit).execution_options(yield_per=100)
+    # Rows are converted batch by batch instead of materializing all ORM objects first
+    transactions = session.exec(query)
+    return _transaction_list_adapter.validate_python(transactions, from_attributes=True)
 
-    # Get category and account names
-    categories = {c.id: c for c in session.exec(select(BudgetCategory)).all()}
-    accounts = {a.id: a for a in session.exec(select(Account)).all()}
 
-    return [
-        {
-            "id": txn.id,
-            "date": txn.date,
-            "description": txn.description,
-            "amount": txn.amount,
-            "category_id": txn.category_id,
-            "category_name": categories.get(txn.category_id).name if txn.category_id and txn.category_id in categories else None,
-            "category_color": categories.get(txn.category_id).color if txn.category_id and txn.category_id in categories else None,
-            "account_id": txn.account_id,
-            "account_name": accounts.get(txn.account_id).name if txn.account_id and txn.account_id in accounts else None,
-            "is_recurring": txn.is_recurring,
-            "recurrence_frequency": txn.recurrence_frequency,
-            "merchant": txn.merchant,
-            "notes": txn.notes,
-            "ai_categorized": txn.ai_categorized,
-            "created_at": txn.created_at,
-        }
-        for txn in transactions
-    ]
-
-
-@router.post("/budget/transactions")
+@router.post("/budget/transactions", response_model=TransactionRead)
 def create_transaction(data: TransactionCreate, session: Session = Depends(get_session)):
     """Create a new transaction."""
-    # Validate category exists if provided
+    # Validate category exists if provided (also puts it in the identity map
+    # so the response below resolves category fields without another query)
     if data.category_id:
         category = session.get(BudgetCategory, data.category_id)
         if not category:
@@ -295,74 +361,27 @@ def create_transaction(data: TransactionCreate, session: Session = Depends(get_s
         notes=data.notes,
     )
     session.add(transaction)
+    session.flush()  # Assigns transaction.id
+    # Build the response now; commit expires the instance
+    response = TransactionRead.model_validate(transaction)
     session.commit()
-    session.refresh(transaction)
 
-    # Get category name
-    category_name = None
-    category_color = None
-    if transaction.category_id:
-        cat = session.get(BudgetCategory, transaction.category_id)
-        if cat:
-            category_name = cat.name
-            category_color = cat.color
+    return response
 
-    return {
-        "id": transaction.id,
-        "date": transaction.date,
-        "description": transaction.description,
-        "amount": transaction.amount,
-        "category_id": transaction.category_id,
-        "category_name": category_name,
-        "category_color": category_color,
-        "account_id": transaction.account_id,
-        "is_recurring": transaction.is_recurring,
-        "recurrence_frequency": transaction.recurrence_frequency,
-        "merchant": transaction.merchant,
-        "notes": transaction.notes,
-        "ai_categorized": transaction.ai_categorized,
-        "created_at": transaction.created_at,
-    }
 
-
-@router.get("/budget/transactions/{transaction_id}")
+@router.get("/budget/transactions/{transaction_id}", response_model=TransactionRead)
 def get_transaction(transaction_id: int, session: Session = Depends(get_session)):
     """Get a specific transaction."""
-    transaction = session.get(Transaction, transaction_id)
+    # One joined SELECT for the transaction, its category and account
+    transaction = session.get(
+        Transaction,
+        transaction_id,
+        options=[joinedload(Transaction.category), joinedload(Transaction.account)],
+    )
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
-    category_name = None
-    category_color = None
-    if transaction.category_id:
-        cat = session.get(BudgetCategory, transaction.category_id)
-        if cat:
-            category_name = cat.name
-            category_color = cat.color
-
-    account_name = None
-    if transaction.account_id:
-        acct = session.get(Account, transaction.account_id)
-        if acct:
-            account_name = acct.name
-
-    return {
-        "id": transaction.id,
-        "date": transaction.date,
-        "description": transaction.description,
-        "amount": transaction.amount,
-        "category_id": transaction.category_id,
-        "category_name": category_name,
-        "category_color": category_color,
-        "account_id": transaction.account_id,
-        "account_name": account_name,
-        "is_recurring": transaction.is_recurring,
-        "recurrence_frequency": transaction.recurrence_frequency,
-        "merchant": transaction.merchant,
-        "notes": transaction.notes,
-        "ai_categorized": transaction.ai_categorized,
-        "created_at": transaction.created_at,
-    }
+    return transaction
 
 
 @router.put("/budget/transactions/{transaction_id}")
@@ -403,11 +422,8 @@ def update_transaction(
         transaction.notes = data.notes
 
     transaction.updated_at = datetime.now(timezone.utc)
-    session.add(transaction)
-    session.commit()
-    session.refresh(transaction)
-
-    return {
+    # Build the response now; commit expires the instance
+    response = {
         "id": transaction.id,
         "date": transaction.date,
         "description": transaction.description,
@@ -419,6 +435,10 @@ def update_transaction(
         "notes": transaction.notes,
     }
 
+    session.commit()
+
+    return response
+
 
 @router.delete("/budget/transactions/{transaction_id}")
 def delete_transaction(transaction_id: int, session: Session = Depends(get_session)):
@@ -435,14 +455,24 @@ def delete_transaction(transaction_id: int, session: Session = Depends(get_sessi
 # --- Subscription Endpoints ---
 
 @router.get("/budget/subscriptions")
-def list_subscriptions(session: Session = Depends(get_session)):
+def list_subscriptions(
+    request: Request,
+    response: Response,
+    session: Session = Depends(get_session),
+):
     """List all subscriptions."""
+    # Category names are part of the payload, so category edits change the tag too
+    etag = table_etag(session, Subscription, BudgetCategory)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     subscriptions = session.exec(
-        select(Subscription).order_by(Subscription.name)
+        select(Subscription)
+        .options(selectinload(Subscription.category))
+        .order_by(Subscription.name)
     ).all()
 
-    categories = {c.id: c for c in session.exec(select(BudgetCategory)).all()}
-
     return [
         {
             "id": sub.id,
@@ -450,7 +480,7 @@ def list_subscriptions(session: Session = Depends(get_session)):
             "amount": sub.amount,
             "frequency": sub.frequency,
             "category_id": sub.category_id,
-            "category_name": categories.get(sub.category_id).name if sub.category_id and sub.category_id in categories else None,
+            "category_name": sub.category.name if sub.category else None,
             "next_billing_date": sub.next_billing_date,
             "is_active": sub.is_active,
         }
@@ -509,11 +539,8 @@ def update_subscription(
         subscription.is_active = data.is_active
 
     subscription.updated_at = datetime.now(timezone.utc)
-    session.add(subscription)
-    session.commit()
-    session.refresh(subscription)
-
-    return {
+    # Build the response now; commit expires the instance
+    response = {
         "id": subscription.id,
         "name": subscription.name,
         "amount": subscription.amount,
@@ -523,6 +550,10 @@ def update_subscription(
         "is_active": subscription.is_active,
     }
 
+    session.commit()
+
+    return response
+
 
 @router.delete("/budget/subscriptions/{subscription_id}")
 def delete_subscription(subscription_id: int, session: Session = Depends(get_session)):
@@ -538,6 +569,12 @@ def delete_subscription(subscription_id: int, session: Session = Depends(get_ses
 
 # --- Analytics Endpoints ---
 
+# Income/expense split of Transaction.amount, summed in SQL. Shared by the
+# analytics queries so the reduction never happens row-by-row in Python.
+INCOME_SUM = func.sum(case((Transaction.amount >= 0, Transaction.amount), else_=0.0))
+EXPENSE_SUM = func.sum(case((Transaction.amount < 0, -Transaction.amount), else_=0.0))
+
+
 @router.get("/budget/summary")
 def get_budget_summary(
     session: Session = Depends(get_session),
@@ -552,50 +589,42 @@ def get_budget_summary(
     if not end_date:
         end_date = datetime.now(timezone.utc)
 
-    transactions = session.exec(
-        select(Transaction)
+    # Aggregate per category in SQL; only one row per category comes back
+    rows = session.exec(
+        select(
+            Transaction.category_id,
+            BudgetCategory,
+            INCOME_SUM,
+            EXPENSE_SUM,
+            func.count(Transaction.id),
+        )
+        .outerjoin(BudgetCategory, BudgetCategory.id == Transaction.category_id)
         .where(Transaction.date >= start_date)
         .where(Transaction.date <= end_date)
+        .group_by(Transaction.category_id, BudgetCategory.id)
+        .order_by(EXPENSE_SUM.desc())
     ).all()
 
-    categories = {c.id: c for c in session.exec(select(BudgetCategory)).all()}
-
     total_income = 0.0
     total_expenses = 0.0
-    by_category = defaultdict(lambda: {"income": 0.0, "expenses": 0.0, "transactions": 0})
-
-    for txn in transactions:
-        if txn.amount >= 0:
-            total_income += txn.amount
-        else:
-            total_expenses += abs(txn.amount)
-
-        cat_id = txn.category_id or 0
-        if txn.amount >= 0:
-            by_category[cat_id]["income"] += txn.amount
-        else:
-            by_category[cat_id]["expenses"] += abs(txn.amount)
-        by_category[cat_id]["transactions"] += 1
-
-    # Build category breakdown
+    transaction_count = 0
     category_breakdown = []
-    for cat_id, data in by_category.items():
-        cat = categories.get(cat_id)
+    for cat_id, cat, cat_income, cat_expenses, count in rows:
+        total_income += cat_income
+        total_expenses += cat_expenses
+        transaction_count += count
         category_breakdown.append({
-            "category_id": cat_id,
+            "category_id": cat_id or 0,
             "category_name": cat.name if cat else "Uncategorized",
             "category_color": cat.color if cat else "#64748b",
             "category_icon": cat.icon if cat else "MoreHorizontal",
             "budget_limit": cat.budget_limit if cat else None,
-            "income": data["income"],
-            "expenses": data["expenses"],
-            "net": data["income"] - data["expenses"],
-            "transactions": data["transactions"],
+            "income": cat_income,
+            "expenses": cat_expenses,
+            "net": cat_income - cat_expenses,
+            "transactions": count,
         })
 
-    # Sort by expenses descending
-    category_breakdown.sort(key=lambda x: x["expenses"], reverse=True)
-
     return {
         "period": {
             "start": start_date,
@@ -604,7 +633,7 @@ def get_budget_summary(
         "total_income": total_income,
         "total_expenses": total_expenses,
         "net": total_income - total_expenses,
-        "transaction_count": len(transactions),
+        "transaction_count": transaction_count,
         "by_category": category_breakdown,
     }
 
@@ -616,40 +645,42 @@ def get_cash_flow(
 ):
     """Get income vs expenses over time (monthly)."""
     end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=months * 30)
-
-    transactions = session.exec(
-        select(Transaction)
+    # Start on the first of the month so the range is whole calendar months
+    year, month = shift_month(end_date.year, end_date.month, -max(months - 1, 0))
+    start_date = datetime(year, month, 1)
+
+    # Bucket by calendar month in SQL; rows come back already sorted
+    month_bucket = month_key(session, Transaction.date).label("month")
+    rows = session.exec(
+        select(month_bucket, INCOME_SUM, EXPENSE_SUM)
         .where(Transaction.date >= start_date)
         .where(Transaction.date <= end_date)
-        .order_by(Transaction.date)
+        .group_by(month_bucket)
+        .order_by(month_bucket)
     ).all()
 
-    # Group by month
-    monthly_data = defaultdict(lambda: {"income": 0.0, "expenses": 0.0})
+    return [
+        {
+            "month": month_label,
+            "income": month_income,
+            "expenses": month_expenses,
+            "net": month_income - month_expenses,
+        }
+        for month_label, month_income, month_expenses in rows
+    ]
 
-    for txn in transactions:
-        month_key = f"{txn.date.year}-{txn.date.month:02d}"
-        if txn.amount >= 0:
-            monthly_data[month_key]["income"] += txn.amount
-        else:
-            monthly_data[month_key]["expenses"] += abs(txn.amount)
-
-    # Build result sorted by month
-    result = []
-    for month_key in sorted(monthly_data.keys()):
-        data = monthly_data[month_key]
-        result.append({
-            "month": month_key,
-            "income": data["income"],
-            "expenses": data["expenses"],
-            "net": data["income"] - data["expenses"],
-        })
 
-    return result
+# --- Forecast Endpoint ---
 
+# Occurrences of a recurring transaction within one calendar month.
+# "daily" depends on the month length and "yearly" on the anchor month,
+# so both are resolved per month in get_forecast.
+_MONTHLY_OCCURRENCES = {
+    "weekly": 4,  # ~4 weeks per month
+    "bi-weekly": 2,
+    "monthly": 1,
+}
 
-# --- Forecast Endpoint ---
 
 @router.get("/budget/forecast")
 def get_forecast(
@@ -660,130 +691,121 @@ def get_forecast(
     Forecast future income and expenses based on recurring transactions.
     Projects recurring transactions forward for the specified number of months.
     """
-    # Get all recurring transactions
-    recurring_txns = session.exec(
-        select(Transaction)
-        .where(Transaction.is_recurring == True)
-        .where(Transaction.recurrence_frequency != None)
-    ).all()
-
-    # Also include active subscriptions
-    subscriptions = session.exec(
-        select(Subscription).where(Subscription.is_active == True)
-    ).all()
-
-    # Get categories for names
-    categories = {c.id: c for c in session.exec(select(BudgetCategory)).all()}
-
-    # Helper to calculate interval in days
-    def get_interval_days(frequency: str) -> int:
-        if frequency == "daily":
-            return 1
-        elif frequency == "weekly":
-            return 7
-        elif frequency == "bi-weekly":
-            return 14
-        elif frequency == "monthly":
-            return 30
-        elif frequency == "yearly":
-            return 365
+    # Recurring transactions and active subscriptions in one round trip,
+    # reading only the columns the projection needs
+    recurring = select(
+        literal("transaction").label("kind"),
+        Transaction.description,
+        Transaction.amount,
+        Transaction.recurrence_frequency,
+        Transaction.date,
+        Transaction.category_id,
+    ).where(
+        Transaction.is_recurring == True,
+        Transaction.recurrence_frequency != None,
+    )
+    active_subscriptions = select(
+        literal("subscription"),
+        Subscription.name,
+        Subscription.amount,
+        Subscription.frequency,
+        Subscription.next_billing_date,
+        Subscription.category_id,
+    ).where(Subscription.is_active == True)
+    rows = session.exec(union_all(recurring, active_subscriptions)).all()
+
+    # Category names are only needed when there is something to project
+    categories = get_categories_cached(session) if rows else {}
+
+    # Resolve everything that doesn't depend on the month once, up front, so
+    # the month loop only does arithmetic on plain tuples (no per-month
+    # category lookups)
+    recurring_items = []
+    subscription_items = []
+    for kind, name, amount, frequency, anchor_date, category_id in rows:
+        category_name = categories[category_id]["name"] if category_id in categories else None
+        if kind == "transaction":
+            recurring_items.append((
+                name,
+                amount,
+                frequency,
+                anchor_date.month,
+                category_name,
+                "income" if amount >= 0 else "expense",
+            ))
         else:
-            return 30  # Default to monthly
+            subscription_items.append((
+                f"Subscription: {name}",
+                -amount,  # Subscriptions are expenses
+                frequency,
+                anchor_date.month if anchor_date else None,
+                category_name or "Subscriptions",
+            ))
 
     # Build forecast data
     today = datetime.now(timezone.utc)
     forecast_data = []
+    total_income = 0.0
+    total_expenses = 0.0
 
     for month_offset in range(months):
-        # Calculate month start and end
-        forecast_month = today.month + month_offset
-        forecast_year = today.year
-        while forecast_month > 12:
-            forecast_month -= 12
-            forecast_year += 1
-
+        forecast_year, forecast_month = shift_month(today.year, today.month, month_offset)
         month_start = datetime(forecast_year, forecast_month, 1)
-        if forecast_month == 12:
-            month_end = datetime(forecast_year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = datetime(forecast_year, forecast_month + 1, 1) - timedelta(days=1)
+        days_in_month = calendar.monthrange(forecast_year, forecast_month)[1]
 
-        month_key = f"{forecast_year}-{forecast_month:02d}"
+        # Occurrences per frequency are the same for every transaction this month
+        occurrences_by_frequency = dict(_MONTHLY_OCCURRENCES, daily=days_in_month)
+
+        month_label = f"{forecast_year}-{forecast_month:02d}"
         month_income = 0.0
         month_expenses = 0.0
         projected_transactions = []
 
         # Project recurring transactions
-        for txn in recurring_txns:
-            frequency = txn.recurrence_frequency
-            interval_days = get_interval_days(frequency)
-
-            # Calculate how many times this transaction occurs in this month
-            if frequency == "monthly":
-                # Assume once per month
-                occurrences = 1
-            elif frequency == "yearly":
-                # Check if this is the month it occurs
-                if txn.date.month == forecast_month:
-                    occurrences = 1
-                else:
-                    occurrences = 0
-            elif frequency == "daily":
-                # Days in month
-                occurrences = (month_end - month_start).days + 1
-            elif frequency == "weekly":
-                occurrences = 4  # ~4 weeks per month
-            elif frequency == "bi-weekly":
-                occurrences = 2
+        for description, amount, frequency, anchor_month, category_name, kind in recurring_items:
+            if frequency == "yearly":
+                # Only in the month it originally occurred
+                occurrences = 1 if anchor_month == forecast_month else 0
             else:
-                occurrences = 1
+                occurrences = occurrences_by_frequency.get(frequency, 1)
 
             if occurrences > 0:
-                total_amount = txn.amount * occurrences
+                total_amount = amount * occurrences
                 if total_amount >= 0:
                     month_income += total_amount
                 else:
-                    month_expenses += abs(total_amount)
+                    month_expenses -= total_amount
 
                 projected_transactions.append({
-                    "description": txn.description,
-                    "amount": txn.amount,
+                    "description": description,
+                    "amount": amount,
                     "occurrences": occurrences,
                     "total": total_amount,
-                    "category_name": categories.get(txn.category_id).name if txn.category_id and txn.category_id in categories else None,
+                    "category_name": category_name,
                     "frequency": frequency,
-                    "type": "income" if txn.amount >= 0 else "expense",
-                })
-
-        # Project subscriptions
-        for sub in subscriptions:
-            if sub.frequency == "monthly":
-                occurrences = 1
-            elif sub.frequency == "yearly":
-                # Check if this subscription's billing month matches
-                if sub.next_billing_date and sub.next_billing_date.month == forecast_month:
-                    occurrences = 1
-                else:
-                    occurrences = 0
-            else:
-                occurrences = 1
-
-            if occurrences > 0:
-                total_amount = -sub.amount * occurrences  # Subscriptions are expenses
-                month_expenses += abs(total_amount)
-
-                projected_transactions.append({
-                    "description": f"Subscription: {sub.name}",
-                    "amount": -sub.amount,
-                    "occurrences": occurrences,
-                    "total": total_amount,
-                    "category_name": categories.get(sub.category_id).name if sub.category_id and sub.category_id in categories else "Subscriptions",
-                    "frequency": sub.frequency,
-                    "type": "expense",
+                    "type": kind,
                 })
 
+        # Project subscriptions (monthly, or yearly in their billing month)
+        for description, amount, frequency, billing_month, category_name in subscription_items:
+            if frequency == "yearly" and billing_month != forecast_month:
+                continue
+
+            month_expenses -= amount
+            projected_transactions.append({
+                "description": description,
+                "amount": amount,
+                "occurrences": 1,
+                "total": amount,
+                "category_name": category_name,
+                "frequency": frequency,
+                "type": "expense",
+            })
+
+        total_income += month_income
+        total_expenses += month_expenses
         forecast_data.append({
-            "month": month_key,
+            "month": month_label,
             "month_name": month_start.strftime("%B %Y"),
             "income": month_income,
             "expenses": month_expenses,
@@ -791,10 +813,6 @@ def get_forecast(
             "transactions": projected_transactions,
         })
 
-    # Calculate totals
-    total_income = sum(m["income"] for m in forecast_data)
-    total_expenses = sum(m["expenses"] for m in forecast_data)
-
     return {
         "months": months,
         "total_projected_income": total_income,
@@ -803,6 +821,6 @@ def get_forecast(
         "monthly_average_income": total_income / months if months > 0 else 0,
         "monthly_average_expenses": total_expenses / months if months > 0 else 0,
         "forecast": forecast_data,
-        "recurring_count": len(recurring_txns),
-        "subscription_count": len(subscriptions),
+        "recurring_count": len(recurring_items),
+        "subscription_count": len(subscription_items),
     }
@@ -1,17 +1,20 @@
 """
 Budget AI API - Auto-categorization, insights, and subscription detection.
 """
+import calendar
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List, Optional
+from sqlmodel import Session, select, update
+from sqlalchemy import LargeBinary, case, cast, func, or_
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
 from datetime import datetime, timedelta, timezone
 
 from core.database import get_session
+from core.queries import month_key, shift_month
 from models import BudgetCategory, Transaction, Subscription
 from services.categorizer import categorize_transaction, detect_recurring_pattern
 from services.ai_insights import (
-    ai_categorize_transaction,
+    ai_categorize_transactions_batch,
     generate_spending_insights,
     generate_enhanced_spending_insights,
     is_ai_available,
@@ -24,6 +27,11 @@ from services.ai_provider import (
     get_provider_info,
     resolve_provider,
 )
+from api.budget import (
+    INCOME_SUM,
+    EXPENSE_SUM,
+    get_categories_cached,
+)
 from api.settings import get_setting_value
 
 router = APIRouter(tags=["Budget AI"])
@@ -86,51 +94,58 @@ def auto_categorize(
     category_map = {c.name: c.id for c in categories}
     category_names = list(category_map.keys())
 
-    # Get transactions to categorize
+    # Get transactions to categorize (only the columns the categorizers read)
+    txn_query = select(
+        Transaction.id, Transaction.description, Transaction.merchant, Transaction.amount
+    )
     if data.transaction_ids:
-        transactions = session.exec(
-            select(Transaction).where(Transaction.id.in_(data.transaction_ids))
-        ).all()
+        txn_query = txn_query.where(Transaction.id.in_(data.transaction_ids))
     else:
         # Get all uncategorized transactions
-        transactions = session.exec(
-            select(Transaction).where(Transaction.category_id == None)
-        ).all()
-
-    results = []
-    updated_count = 0
+        txn_query = txn_query.where(Transaction.category_id == None)
+    transactions = session.exec(txn_query).all()
 
+    # First pass: rule-based categorization (fast, free)
+    matches = []
+    uncertain = []
     for txn in transactions:
-        # Try rule-based categorization first
         category_name, confidence = categorize_transaction(
             txn.description,
             txn.merchant,
             txn.amount
         )
-
-        method = "rules"
-
-        # If confidence is low, try AI
-        if (not category_name or confidence < 0.7) and is_ai_available(api_key):
-            ai_result = ai_categorize_transaction(
-                txn.description,
-                txn.merchant,
-                txn.amount,
-                category_names
-            )
+        matches.append([category_name, confidence, "rules"])
+        if not category_name or confidence < 0.7:
+            uncertain.append(len(matches) - 1)
+
+    # Second pass: send the uncertain ones to the AI in batched prompts
+    if uncertain and is_ai_available(api_key):
+        ai_results = ai_categorize_transactions_batch(
+            [
+                {
+                    "description": transactions[i].description,
+                    "merchant": transactions[i].merchant,
+                    "amount": transactions[i].amount,
+                }
+                for i in uncertain
+            ],
+            category_names,
+        )
+        for i, ai_result in zip(uncertain, ai_results):
             if ai_result and ai_result.get("category_name"):
-                category_name = ai_result["category_name"]
-                confidence = ai_result.get("confidence", 0.8)
-                method = "ai"
+                matches[i] = [ai_result["category_name"], ai_result.get("confidence", 0.8), "ai"]
+
+    results = []
+    updated_count = 0
+    # (category_id, ai_categorized) -> transaction ids
+    updates: Dict[Tuple[int, bool], List[int]] = {}
 
+    for txn, (category_name, confidence, method) in zip(transactions, matches):
         # Update transaction if we found a category
         category_id = None
         if category_name and category_name in category_map:
             category_id = category_map[category_name]
-            txn.category_id = category_id
-            txn.ai_categorized = (method == "ai")
-            txn.updated_at = datetime.now(timezone.utc)
-            session.add(txn)
+            updates.setdefault((category_id, method == "ai"), []).append(txn.id)
             updated_count += 1
 
         results.append({
@@ -141,6 +156,14 @@ def auto_categorize(
             "method": method,
         })
 
+    # One UPDATE per target category instead of one per transaction
+    now = datetime.now(timezone.utc)
+    for (category_id, ai_categorized), ids in updates.items():
+        session.exec(
+            update(Transaction)
+            .where(Transaction.id.in_(ids))
+            .values(category_id=category_id, ai_categorized=ai_categorized, updated_at=now)
+        )
     session.commit()
 
     return {
@@ -164,113 +187,101 @@ def get_insights(
     """
     # Load API key from settings
     api_key = load_ai_config(session)
+    ai_available = is_ai_available(api_key)
+    provider_name = get_provider_info()["display_name"] if ai_available else None
 
     # Get current month's summary
     today = datetime.now(timezone.utc)
     start_date = datetime(today.year, today.month, 1)
     end_date = today
 
-    transactions = session.exec(
-        select(Transaction)
+    # Aggregate per category in SQL; only one row per category comes back
+    categories = get_categories_cached(session)
+    rows = session.exec(
+        select(
+            Transaction.category_id,
+            INCOME_SUM,
+            EXPENSE_SUM,
+            func.count(Transaction.id),
+        )
         .where(Transaction.date >= start_date)
         .where(Transaction.date <= end_date)
+        .group_by(Transaction.category_id)
+        .order_by(EXPENSE_SUM.desc())
     ).all()
 
-    categories = {c.id: c for c in session.exec(select(BudgetCategory)).all()}
-
-    # Build summary
-    from collections import defaultdict
     total_income = 0.0
     total_expenses = 0.0
-    by_category = defaultdict(lambda: {"income": 0.0, "expenses": 0.0, "transactions": 0})
-
-    for txn in transactions:
-        if txn.amount >= 0:
-            total_income += txn.amount
-        else:
-            total_expenses += abs(txn.amount)
-
-        cat_id = txn.category_id or 0
-        if txn.amount >= 0:
-            by_category[cat_id]["income"] += txn.amount
-        else:
-            by_category[cat_id]["expenses"] += abs(txn.amount)
-        by_category[cat_id]["transactions"] += 1
-
     category_breakdown = []
-    for cat_id, data in by_category.items():
+    for cat_id, cat_income, cat_expenses, count in rows:
+        total_income += cat_income
+        total_expenses += cat_expenses
         cat = categories.get(cat_id)
         category_breakdown.append({
-            "category_id": cat_id,
-            "category_name": cat.name if cat else "Uncategorized",
-            "budget_limit": cat.budget_limit if cat else None,
-            "income": data["income"],
-            "expenses": data["expenses"],
-            "transactions": data["transactions"],
+            "category_id": cat_id or 0,
+            "category_name": cat["name"] if cat else "Uncategorized",
+            "budget_limit": cat["budget_limit"] if cat else None,
+            "income": cat_income,
+            "expenses": cat_expenses,
+            "transactions": count,
         })
 
     summary = {
         "total_income": total_income,
         "total_expenses": total_expenses,
-        "by_category": sorted(category_breakdown, key=lambda x: x["expenses"], reverse=True),
+        "by_category": category_breakdown,
     }
 
     # Get previous month for comparison
-    prev_start = datetime(today.year, today.month - 1 if today.month > 1 else 12, 1)
-    if today.month == 1:
-        prev_start = prev_start.replace(year=today.year - 1)
-    prev_end = start_date - timedelta(days=1)
+    prev_start = datetime(*shift_month(today.year, today.month, -1), 1)
 
-    prev_txns = session.exec(
-        select(Transaction)
+    prev_income, prev_expenses = session.exec(
+        select(INCOME_SUM, EXPENSE_SUM)
         .where(Transaction.date >= prev_start)
-        .where(Transaction.date <= prev_end)
-    ).all()
-
-    prev_expenses = sum(abs(t.amount) for t in prev_txns if t.amount < 0)
-    prev_income = sum(t.amount for t in prev_txns if t.amount >= 0)
+        .where(Transaction.date < start_date)
+    ).one()
 
     prev_summary = {
-        "total_income": prev_income,
-        "total_expenses": prev_expenses,
+        "total_income": prev_income or 0.0,
+        "total_expenses": prev_expenses or 0.0,
     }
 
-    # Generate insights
+    # The insight generators only look at individual transactions to call
+    # out the single biggest expense, so that is the only row we load
+    biggest_expense = session.exec(
+        select(Transaction.description, Transaction.amount, Transaction.merchant)
+        .where(Transaction.date >= start_date)
+        .where(Transaction.date <= end_date)
+        .where(Transaction.amount < 0)
+        .order_by(Transaction.amount)
+        .limit(1)
+    ).all()
     txn_dicts = [
         {"description": t.description, "amount": t.amount, "merchant": t.merchant}
-        for t in transactions
+        for t in biggest_expense
     ]
 
     if enhanced:
-        # Fetch cash flow data (last 6 months of monthly aggregates)
-        cash_flow_data = []
-        for i in range(6, 0, -1):
-            m = today.month - i
-            y = today.year
-            while m <= 0:
-                m += 12
-                y -= 1
-            m_start = datetime(y, m, 1)
-            if m == 12:
-                m_end = datetime(y + 1, 1, 1) - timedelta(days=1)
-            else:
-                m_end = datetime(y, m + 1, 1) - timedelta(days=1)
-
-            m_txns = session.exec(
-                select(Transaction)
-                .where(Transaction.date >= m_start)
-                .where(Transaction.date <= m_end)
-            ).all()
-
-            if m_txns:
-                m_income = sum(t.amount for t in m_txns if t.amount >= 0)
-                m_expenses = sum(abs(t.amount) for t in m_txns if t.amount < 0)
-                cash_flow_data.append({
-                    "month": m_start.strftime("%Y-%m"),
-                    "total_income": m_income,
-                    "total_expenses": m_expenses,
-                    "net": m_income - m_expenses,
-                })
+        # Fetch cash flow data (last 6 full months of monthly aggregates),
+        # bucketed by calendar month in a single query
+        year, month = shift_month(today.year, today.month, -6)
+        month_bucket = month_key(session, Transaction.date).label("month")
+        cash_flow_rows = session.exec(
+            select(month_bucket, INCOME_SUM, EXPENSE_SUM)
+            .where(Transaction.date >= datetime(year, month, 1))
+            .where(Transaction.date < start_date)
+            .group_by(month_bucket)
+            .order_by(month_bucket)
+        ).all()
+        cash_flow_data = [
+            {
+                "month": m,
+                "total_income": m_income,
+                "total_expenses": m_expenses,
+                "net": m_income - m_expenses,
+            }
+            for m, m_income, m_expenses in cash_flow_rows
+        ]
 
         # Fetch active subscriptions
         subs = session.exec(
@@ -281,6 +292,10 @@ def get_insights(
             for s in subs
         ]
 
+        # Everything below works on plain dicts; hand the pooled connection
+        # back before the (potentially slow) LLM round-trip.
+        session.close()
+
         result = generate_enhanced_spending_insights(
             summary, txn_dicts, prev_summary,
             cash_flow_data=cash_flow_data if cash_flow_data else None,
@@ -288,11 +303,10 @@ def get_insights(
             api_key=api_key,
         )
 
-        info = get_provider_info()
         response = {
             "insights": result.get("insights", []),
-            "ai_powered": is_ai_available(api_key),
-            "ai_provider_name": info["display_name"] if is_ai_available(api_key) else None,
+            "ai_powered": ai_available,
+            "ai_provider_name": provider_name,
             "period": {"start": start_date, "end": end_date},
         }
         if "trend_analysis" in result:
@@ -301,13 +315,13 @@ def get_insights(
             response["subscription_suggestions"] = result["subscription_suggestions"]
         return response
     else:
+        session.close()
         insights = generate_spending_insights(summary, txn_dicts, prev_summary)
 
-        info = get_provider_info()
         return {
             "insights": insights,
-            "ai_powered": is_ai_available(api_key),
-            "ai_provider_name": info["display_name"] if is_ai_available(api_key) else None,
+            "ai_powered": ai_available,
+            "ai_provider_name": provider_name,
             "period": {
                 "start": start_date,
                 "end": end_date,
@@ -315,6 +329,35 @@ def get_insights(
         }
 
 
+_MIN_RECURRING_OCCURRENCES = 2
+
+
+# Characters str.split() treats as whitespace within ASCII
+_ASCII_WHITESPACE = " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+
+def _recurrence_key(text):
+    """SQL approximation of detect_recurring_pattern's grouping key.
+
+    Lower-cases the text and strips the same digits/symbols plus all ASCII
+    whitespace. For ASCII text this is the Python key with its spaces
+    removed, so it is never finer and the prefilter is safe. It is not safe
+    for other text: SQL lower() only folds ASCII, and str.split() also
+    collapses Unicode whitespace (see _has_non_ascii).
+    """
+    key = func.lower(text)
+    for char in "0123456789#*-_" + _ASCII_WHITESPACE:
+        key = func.replace(key, char, "")
+    return key
+
+
+def _has_non_ascii(session: Session, text):
+    """SQL condition: ``text`` contains a multi-byte (non-ASCII) character."""
+    if session.get_bind().dialect.name == "postgresql":
+        return func.octet_length(text) != func.char_length(text)
+    return func.length(cast(text, LargeBinary)) != func.length(text)
+
+
 @router.post("/budget/ai/detect-subscriptions")
 def detect_subscriptions(
     session: Session = Depends(get_session),
@@ -328,35 +371,52 @@ def detect_subscriptions(
     end_date = datetime.now(timezone.utc)
     start_date = end_date - timedelta(days=months * 30)
 
-    transactions = session.exec(
-        select(Transaction)
+    # Most merchants appear once and can never form a pattern, so drop them
+    # in SQL: count rows per (coarsened) grouping key and keep repeats only.
+    # The key only matches the Python grouping for ASCII text, so any
+    # non-ASCII row in the window turns the prefilter off.
+    text = func.coalesce(Transaction.merchant, "") + Transaction.description
+    candidates = (
+        select(
+            Transaction.description,
+            Transaction.merchant,
+            Transaction.amount,
+            Transaction.date,
+            func.count().over(partition_by=_recurrence_key(text)).label("occurrences"),
+            func.max(case((_has_non_ascii(session, text), 1), else_=0)).over().label("non_ascii"),
+        )
         .where(Transaction.date >= start_date)
         .where(Transaction.date <= end_date)
         .where(Transaction.amount < 0)  # Only expenses
-        .order_by(Transaction.date)
+        .subquery()
+    )
+    transactions = session.exec(
+        select(
+            candidates.c.description,
+            candidates.c.merchant,
+            candidates.c.amount,
+            candidates.c.date,
+        )
+        .where(or_(
+            candidates.c.occurrences >= _MIN_RECURRING_OCCURRENCES,
+            candidates.c.non_ascii == 1,
+        ))
+        .order_by(candidates.c.date)
     ).all()
 
     # Convert to dicts for detection
-    txn_dicts = [
-        {
-            "description": t.description,
-            "merchant": t.merchant,
-            "amount": t.amount,
-            "date": t.date,
-        }
-        for t in transactions
-    ]
+    txn_dicts = [dict(row._mapping) for row in transactions]
 
     # Detect recurring patterns
-    detected = detect_recurring_pattern(txn_dicts)
+    detected = detect_recurring_pattern(txn_dicts, min_occurrences=_MIN_RECURRING_OCCURRENCES)
 
     # Get existing subscriptions to avoid duplicates
-    existing_subs = session.exec(select(Subscription)).all()
-    existing_names = {s.name.lower() for s in existing_subs}
+    existing_subs = session.exec(select(Subscription.name)).all()
+    existing_names = {name.lower() for name in existing_subs}
 
     # Get subscriptions category
-    sub_category = session.exec(
-        select(BudgetCategory).where(BudgetCategory.name == "Subscriptions")
+    sub_category_id = session.exec(
+        select(BudgetCategory.id).where(BudgetCategory.name == "Subscriptions")
     ).first()
 
     new_suggestions = []
@@ -369,7 +429,7 @@ def detect_subscriptions(
                 "frequency": pattern["frequency"],
                 "occurrences": pattern["occurrences"],
                 "last_date": pattern["last_date"],
-                "suggested_category_id": sub_category.id if sub_category else None,
+                "suggested_category_id": sub_category_id,
             })
 
     return {
@@ -390,20 +450,20 @@ def create_subscription_from_detection(
     """Create a subscription from a detected pattern."""
     # Check if already exists
     existing = session.exec(
-        select(Subscription).where(Subscription.name == name)
+        select(Subscription.id).where(Subscription.name == name).limit(1)
     ).first()
     if existing:
         raise HTTPException(status_code=400, detail="Subscription with this name already exists")
 
     # Calculate next billing date (assume monthly for now)
-    from datetime import date
-    today = date.today()
+    today = datetime.now(timezone.utc)
     if frequency == "monthly":
-        next_billing = datetime(today.year, today.month + 1 if today.month < 12 else 1, 1)
-        if today.month == 12:
-            next_billing = next_billing.replace(year=today.year + 1)
+        next_billing = datetime(*shift_month(today.year, today.month, 1), 1)
     elif frequency == "yearly":
-        next_billing = datetime(today.year + 1, today.month, today.day)
+        # Clamp Feb 29 to Feb 28 when next year isn't a leap year
+        year = today.year + 1
+        day = min(today.day, calendar.monthrange(year, today.month)[1])
+        next_billing = datetime(year, today.month, day)
     else:
         next_billing = None
 
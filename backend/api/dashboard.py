@@ -1,39 +1,290 @@
 """
 Dashboard API - Net worth calculation including cash, investments, and real estate.
 """
+import json
 import logging
+import time
+from collections import defaultdict
+from functools import lru_cache
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from typing import Dict
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel
 
 from core.database import get_session
-from core.queries import get_latest_account_balances, get_latest_liability_balances
-from core.fx_service import convert_to_base
+from core.queries import latest_liability_amounts_subquery, table_etag
+from core.fx_service import get_rates, rate_table, rates_version
 from models import Account, Liability, BalanceSnapshot, Portfolio, PortfolioHolding, Property, Mortgage, NetWorthSnapshot, AppSettings
 
 logger = logging.getLogger(__name__)
 
+# Routes declare a response_model so the (potentially large) payloads are
+# serialized straight to JSON bytes through pydantic-core; the cached
+# net worth endpoints do that once themselves and reuse the bytes.
 router = APIRouter()
 
+# Computed net worth payloads, keyed by endpoint:
+# {"networth": {"etag": str, "body": bytes, "fetched_at": float}}; "body"
+# is the serialized JSON, except for history and the shared mortgage rows,
+# which keep their row tuples
+_NETWORTH_CACHE_TTL = 60
+_networth_cache: Dict[str, dict] = {}
+
+
+# Pydantic schemas
+class NetWorthItem(BaseModel):
+    name: str
+    balance: float
+    currency: str
+    original_currency: str
+    type: str
+
+
+class NetWorthTotals(BaseModel):
+    cash_accounts: float
+    investments: float
+    real_estate: float
+    mortgages: float
+
+
+class NetWorthResponse(BaseModel):
+    net_worth: float
+    total_assets: float
+    total_liabilities: float
+    currency: str
+    breakdown: NetWorthTotals
+    assets: List[NetWorthItem]
+    liabilities: List[NetWorthItem]
+
+
+class NetWorthHistoryPoint(BaseModel):
+    date: str
+    assets: float
+    liabilities: float
+    net_worth: float
+
+
+class CashItem(BaseModel):
+    id: int
+    name: str
+    balance: float
+    institution: Optional[str]
+    type: str
+
+
+class InvestmentItem(BaseModel):
+    id: int
+    name: str
+    value: float
+    holdings_count: int
+
+
+class RealEstateItem(BaseModel):
+    id: int
+    name: str
+    property_type: str
+    current_value: float
+    mortgage_balance: float
+    equity: float
+
+
+class LiabilityItem(BaseModel):
+    id: Union[int, str]  # "mortgage_<id>" for mortgages
+    name: str
+    balance: float
+    category: Optional[str]
+
+
+class CashCategory(BaseModel):
+    total: float
+    items: List[CashItem]
+
+
+class InvestmentCategory(BaseModel):
+    total: float
+    items: List[InvestmentItem]
+
+
+class RealEstateCategory(BaseModel):
+    total: float
+    items: List[RealEstateItem]
+
+
+class LiabilityCategory(BaseModel):
+    total: float
+    items: List[LiabilityItem]
+
+
+class BreakdownCategories(BaseModel):
+    cash: CashCategory
+    investments: InvestmentCategory
+    real_estate: RealEstateCategory
+    liabilities: LiabilityCategory
+
+
+class NetWorthBreakdownResponse(BaseModel):
+    net_worth: float
+    total_assets: float
+    total_liabilities: float
+    currency: str
+    categories: BreakdownCategories
+
+
+# Static hot-path statements are built once at import; SQLAlchemy memoizes
+# their cache keys, so each request skips construction and key generation.
+_BASE_CURRENCY_QUERY = select(AppSettings.value).where(AppSettings.key == "default_currency")
+# Holding values summed per (portfolio, currency) in SQL, so FX is applied
+# once per group; the owning portfolio's name/currency ride along. Groups
+# come back in first-holding order, matching the per-holding walk.
+_HOLDING_TOTALS_QUERY = (
+    select(
+        PortfolioHolding.portfolio_id,
+        PortfolioHolding.currency,
+        func.sum(PortfolioHolding.current_value),
+        func.count(PortfolioHolding.id),
+        Portfolio.name,
+        Portfolio.currency,
+    )
+    .outerjoin(Portfolio, Portfolio.id == PortfolioHolding.portfolio_id)
+    .group_by(
+        PortfolioHolding.portfolio_id, PortfolioHolding.currency,
+        Portfolio.name, Portfolio.currency,
+    )
+    .order_by(func.min(PortfolioHolding.id))
+)
+# The endpoints only read a few fields per row, so select those columns
+# rather than hydrating ORM objects; rows still allow attribute access.
+_ACCOUNTS_QUERY = select(
+    Account.id, Account.name, Account.institution, Account.type,
+    Account.currency, Account.current_balance,
+).order_by(Account.id)
+_PROPERTIES_QUERY = select(
+    Property.id, Property.name, Property.property_type,
+    Property.currency, Property.current_value,
+).order_by(Property.id)
+# Active mortgages joined to their property, whose currency they are held in
+_MORTGAGES_QUERY = (
+    select(
+        Mortgage.id,
+        Mortgage.property_id,
+        Mortgage.current_balance,
+        Property.name.label("property_name"),
+        Property.currency.label("property_currency"),
+    )
+    .outerjoin(Property, Property.id == Mortgage.property_id)
+    .where(Mortgage.is_active == True)
+    .order_by(Mortgage.id)
+)
+
 
 def _get_base_currency(session: Session) -> str:
     """Get user's base currency from app settings, default USD."""
-    setting = session.exec(
-        select(AppSettings).where(AppSettings.key == "default_currency")
-    ).first()
-    return setting.value if setting and setting.value else "USD"
+    return session.exec(_BASE_CURRENCY_QUERY).first() or "USD"
+
+
+def _fx(amount: float, from_ccy: str, rates: Dict[str, float]) -> float:
+    """Convert amount to base currency using a table from rate_table()."""
+    return amount * rates.get(from_ccy, rates["USD"])
 
 
-def _fx(amount: float, from_ccy: str, base_ccy: str) -> float:
-    """Convert amount to base currency. No-op when currencies match."""
-    if from_ccy == base_ccy:
-        return amount
-    return convert_to_base(amount, from_ccy, base_ccy)
+def _liabilities_with_balances(session: Session):
+    """Liability rows with their latest ``amount`` (or None), in a single query."""
+    latest = latest_liability_amounts_subquery(session)
+    return session.exec(_liabilities_with_balances_query(latest)).all()
 
 
-@router.get("/networth")
-def get_networth(session: Session = Depends(get_session)):
+@lru_cache(maxsize=None)
+def _liabilities_with_balances_query(latest):
+    """The joined statement, built once per (cached) latest-amount subquery."""
+    return (
+        select(
+            Liability.id, Liability.name, Liability.category, Liability.currency,
+            latest.c.amount,
+        )
+        .outerjoin(latest, latest.c.liability_id == Liability.id)
+        .order_by(Liability.id)
+    )
+
+
+def _converted_mortgages(session: Session, etag: str, rates: Dict[str, float]) -> list:
+    """Active mortgages as (id, property_id, property name, currency, converted balance).
+
+    /networth and /networth/breakdown are fetched together on page load,
+    so the converted rows are cached under their shared ETag and the
+    second endpoint reuses them instead of re-reading mortgages.
+    """
+    cached = _get_cached_networth("mortgages", etag)
+    if cached is not None:
+        return cached
+
+    rows = []
+    for m in session.exec(_MORTGAGES_QUERY).all():
+        prop_name = m.property_name
+        if prop_name is None:
+            prop_name = f"Property {m.property_id}"
+        m_ccy = m.property_currency or "USD"
+        converted = _fx(m.current_balance, m_ccy, rates)
+        rows.append((m.id, m.property_id, prop_name, m_ccy, converted))
+    _networth_cache["mortgages"] = {"etag": etag, "body": rows, "fetched_at": time.time()}
+    return rows
+
+
+def _networth_etag(session: Session, *extra_models) -> str:
+    """ETag over every table the net worth endpoints read, plus FX rates.
+
+    Today's date is included so the first request of a new day still
+    recomputes (and persists) that day's snapshot. get_rates() runs first
+    (a dict check while the rates are fresh) so an expired rate set is
+    refetched here; otherwise clients revalidating with If-None-Match would
+    keep getting 304s for totals converted at the old rates.
+    """
+    get_rates()
+    return table_etag(
+        session,
+        Account, Liability, BalanceSnapshot, Portfolio, PortfolioHolding,
+        Property, Mortgage, AppSettings, *extra_models,
+        extra=(datetime.now(timezone.utc).strftime("%Y-%m-%d"), rates_version()),
+    )
+
+
+def _get_cached_networth(key: str, etag: str):
+    """Return a cached payload if it was computed for this ETag within the TTL."""
+    cached = _networth_cache.get(key)
+    if (
+        cached
+        and cached["etag"] == etag
+        and time.time() - cached["fetched_at"] < _NETWORTH_CACHE_TTL
+    ):
+        return cached["body"]
+    return None
+
+
+def _json_response(content: bytes, etag: str) -> Response:
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
+
+
+def _cache_json(key: str, etag: str, model, body: dict) -> Response:
+    """Validate and serialize ``body`` once, then cache and return the bytes.
+
+    Cache hits hand the stored bytes straight back, skipping response_model
+    validation and serialization entirely.
+    """
+    content = model.model_validate(body).model_dump_json().encode()
+    _networth_cache[key] = {"etag": etag, "body": content, "fetched_at": time.time()}
+    return _json_response(content, etag)
+
+
+@router.get("/networth", response_model=NetWorthResponse)
+def get_networth(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: Session = Depends(get_session),
+):
     """
     Get the latest Net Worth snapshot.
     Includes:
@@ -41,18 +292,23 @@ def get_networth(session: Session = Depends(get_session)):
     - Investment portfolios (from PortfolioHolding)
     - Real estate equity (from Property - Mortgage)
     """
+    etag = _networth_etag(session)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    cached = _get_cached_networth("networth", etag)
+    if cached is not None:
+        return _json_response(cached, etag)
+
     base_ccy = _get_base_currency(session)
+    rates = rate_table(base_ccy)
 
     # 1. Cash Accounts (Assets)
-    accounts = session.exec(select(Account)).all()
-    acct_balances = get_latest_account_balances(session)
+    accounts = session.exec(_ACCOUNTS_QUERY).all()
     total_cash = 0.0
     asset_breakdown = []
 
     for account in accounts:
-        snap = acct_balances.get(account.id)
-        raw_balance = snap.amount if snap else 0.0
-        balance = _fx(raw_balance, account.currency, base_ccy)
+        balance = _fx(account.current_balance, account.currency, rates)
         total_cash += balance
         asset_breakdown.append({
             "name": account.name,
@@ -63,55 +319,36 @@ def get_networth(session: Session = Depends(get_session)):
         })
 
     # 2. Investment Portfolios
-    holdings = session.exec(select(PortfolioHolding)).all()
-    portfolios = session.exec(select(Portfolio)).all()
-    portfolio_map = {p.id: p for p in portfolios}
+    holding_totals = session.exec(_HOLDING_TOTALS_QUERY).all()
 
     total_investments = 0.0
 
-    # Group holdings by portfolio, converting each holding's currency
-    portfolio_values: Dict[int, float] = {}
-    for h in holdings:
-        h_ccy = h.currency or "USD"
-        converted = _fx(h.current_value or 0, h_ccy, base_ccy)
+    # Combine each portfolio's per-currency totals in the base currency
+    portfolio_values: Dict[int, float] = defaultdict(float)
+    portfolio_info: Dict[int, tuple] = {}
+    for portfolio_id, h_ccy, value, _count, p_name, p_ccy in holding_totals:
+        converted = _fx(value or 0, h_ccy or "USD", rates)
         total_investments += converted
-        if h.portfolio_id not in portfolio_values:
-            portfolio_values[h.portfolio_id] = 0
-        portfolio_values[h.portfolio_id] += converted
+        portfolio_values[portfolio_id] += converted
+        portfolio_info[portfolio_id] = (p_name, p_ccy)
 
     for portfolio_id, value in portfolio_values.items():
-        p = portfolio_map.get(portfolio_id)
+        p_name, p_ccy = portfolio_info[portfolio_id]
         asset_breakdown.append({
-            "name": p.name if p else f"Portfolio {portfolio_id}",
+            "name": p_name if p_name is not None else f"Portfolio {portfolio_id}",
             "balance": value,
             "currency": base_ccy,
-            "original_currency": p.currency if p else "USD",
+            "original_currency": p_ccy or "USD",
             "type": "investment"
         })
 
     # 3. Real Estate (show gross property values as assets)
-    properties = session.exec(select(Property)).all()
-    mortgages = session.exec(select(Mortgage)).all()
-
-    # Build property currency lookup for mortgages
-    prop_currency: Dict[int, str] = {p.id: p.currency for p in properties}
-
-    # Group mortgages by property for reference
-    mortgage_by_property: Dict[int, float] = {}
-    total_mortgage_balance = 0.0
-    for m in mortgages:
-        if m.is_active:
-            m_ccy = prop_currency.get(m.property_id, "USD")
-            converted = _fx(m.current_balance, m_ccy, base_ccy)
-            if m.property_id not in mortgage_by_property:
-                mortgage_by_property[m.property_id] = 0
-            mortgage_by_property[m.property_id] += converted
-            total_mortgage_balance += converted
+    properties = session.exec(_PROPERTIES_QUERY).all()
 
     total_real_estate_value = 0.0
 
     for prop in properties:
-        converted = _fx(prop.current_value, prop.currency, base_ccy)
+        converted = _fx(prop.current_value, prop.currency, rates)
         total_real_estate_value += converted
 
         asset_breakdown.append({
@@ -123,32 +360,24 @@ def get_networth(session: Session = Depends(get_session)):
         })
 
     # 4. Liabilities (including mortgages)
-    liabilities = session.exec(select(Liability)).all()
-    total_liabilities = 0.0
     liab_breakdown = []
 
-    # Add mortgages to liabilities
-    for m in mortgages:
-        if m.is_active:
-            prop = next((p for p in properties if p.id == m.property_id), None)
-            prop_name = prop.name if prop else f"Property {m.property_id}"
-            m_ccy = prop.currency if prop else "USD"
-            converted = _fx(m.current_balance, m_ccy, base_ccy)
-            liab_breakdown.append({
-                "name": f"Mortgage - {prop_name}",
-                "balance": converted,
-                "currency": base_ccy,
-                "original_currency": m_ccy,
-                "type": "mortgage"
-            })
-    total_liabilities += total_mortgage_balance
+    # Add mortgages to liabilities (single pass: items and total together)
+    total_mortgage_balance = 0.0
+    for _m_id, _prop_id, prop_name, m_ccy, converted in _converted_mortgages(session, etag, rates):
+        total_mortgage_balance += converted
+        liab_breakdown.append({
+            "name": f"Mortgage - {prop_name}",
+            "balance": converted,
+            "currency": base_ccy,
+            "original_currency": m_ccy,
+            "type": "mortgage"
+        })
+    total_liabilities = total_mortgage_balance
 
     # Add other liabilities
-    liab_balances = get_latest_liability_balances(session)
-    for liab in liabilities:
-        snap = liab_balances.get(liab.id)
-        raw_balance = snap.amount if snap else 0.0
-        balance = _fx(raw_balance, liab.currency, base_ccy)
+    for liab in _liabilities_with_balances(session):
+        balance = _fx(liab.amount or 0.0, liab.currency, rates)
         total_liabilities += balance
         liab_breakdown.append({
             "name": liab.name,
@@ -163,13 +392,15 @@ def get_networth(session: Session = Depends(get_session)):
     # Net worth = Assets - Liabilities (mortgages are now in liabilities)
     net_worth = total_assets - total_liabilities
 
-    # Persist today's snapshot (upsert) so history chart has real data
-    _upsert_today_snapshot(
-        session, total_cash, total_investments, total_real_estate_value,
+    # Persist today's snapshot (upsert) so history chart has real data.
+    # Runs after the response is sent, so the read doesn't wait on a commit
+    background_tasks.add_task(
+        _upsert_today_snapshot,
+        session.get_bind(), total_cash, total_investments, total_real_estate_value,
         total_liabilities - total_mortgage_balance, total_mortgage_balance, net_worth,
     )
 
-    return {
+    body = {
         "net_worth": net_worth,
         "total_assets": total_assets,
         "total_liabilities": total_liabilities,
@@ -183,40 +414,80 @@ def get_networth(session: Session = Depends(get_session)):
         "assets": asset_breakdown,
         "liabilities": liab_breakdown
     }
+    return _cache_json("networth", etag, NetWorthResponse, body)
 
 
-@router.get("/networth/history")
-def get_networth_history(session: Session = Depends(get_session)):
+@router.get("/networth/history", response_model=List[NetWorthHistoryPoint])
+def get_networth_history(
+    request: Request,
+    stream: bool = False,
+    session: Session = Depends(get_session),
+):
     """
     Get historical Net Worth over time using daily snapshots.
     Each snapshot records the actual component values on that day,
     so the chart reflects real historical values rather than projecting
     today's portfolio/real-estate values backward.
+
+    Clients sending ``Accept: application/x-ndjson`` (or ``?stream=1``)
+    get one JSON object per line, streamed as it is serialized, instead
+    of a single array.
     """
-    from services.snapshot import compute_net_worth_components
+    ndjson = stream or "application/x-ndjson" in request.headers.get("accept", "")
+
+    # Past days only change when rows are added (backfill, day rollover),
+    # and today's point derives from the same tables as /networth
+    etag = _networth_etag(session, NetWorthSnapshot)
+    rows = _get_cached_networth("history", etag)
+    if rows is None and ndjson:
+        # Stream straight off the cursor rather than materializing the list
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        today_row = _live_today_row(session, today)
+        return StreamingResponse(
+            _history_ndjson(_stream_stored_history(session.get_bind(), today, today_row)),
+            media_type="application/x-ndjson",
+        )
+    if rows is None:
+        rows = _compute_history_rows(session)
+        _networth_cache["history"] = {"etag": etag, "body": rows, "fetched_at": time.time()}
+
+    if ndjson:
+        return StreamingResponse(_history_ndjson(rows), media_type="application/x-ndjson")
+
+    return [
+        {
+            "date": date,
+            "assets": total_assets,
+            "liabilities": total_liab,
+            "net_worth": net_worth,
+        }
+        for date, total_assets, total_liab, net_worth in rows
+    ]
 
-    # Fetch stored daily snapshots
-    nw_snapshots = session.exec(
-        select(NetWorthSnapshot).order_by(NetWorthSnapshot.date)
-    ).all()
 
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+def _stored_history_query(today: str):
+    """Stored daily snapshots with the totals summed in SQL, oldest first.
 
-    history_list = []
-    for snap in nw_snapshots:
-        # Skip today's stored row — we'll append a live one below
-        if snap.date == today:
-            continue
-        total_assets = snap.total_cash + snap.total_investments + snap.total_real_estate
-        total_liab = snap.total_liabilities + snap.total_mortgages
-        history_list.append({
-            "date": snap.date,
-            "assets": total_assets,
-            "liabilities": total_liab,
-            "net_worth": snap.net_worth,
-        })
+    Today's stored row is skipped; callers append a live one instead.
+    """
+    return (
+        select(
+            NetWorthSnapshot.date,
+            NetWorthSnapshot.total_cash
+            + NetWorthSnapshot.total_investments
+            + NetWorthSnapshot.total_real_estate,
+            NetWorthSnapshot.total_liabilities + NetWorthSnapshot.total_mortgages,
+            NetWorthSnapshot.net_worth,
+        )
+        .where(NetWorthSnapshot.date != today)
+        .order_by(NetWorthSnapshot.date)
+    )
+
+
+def _live_today_row(session: Session, today: str) -> tuple:
+    """Today's (date, assets, liabilities, net_worth) from current values."""
+    from services.snapshot import compute_net_worth_components
 
-    # Always append a live "today" data point from current values
     components = compute_net_worth_components(session)
     total_assets_today = (
         components["total_cash"]
@@ -224,33 +495,66 @@ def get_networth_history(session: Session = Depends(get_session)):
         + components["total_real_estate"]
     )
     total_liab_today = components["total_liabilities"] + components["total_mortgages"]
-    history_list.append({
-        "date": today,
-        "assets": total_assets_today,
-        "liabilities": total_liab_today,
-        "net_worth": components["net_worth"],
-    })
+    return (today, total_assets_today, total_liab_today, components["net_worth"])
 
-    return history_list
 
+def _compute_history_rows(session: Session) -> list:
+    """(date, assets, liabilities, net_worth) per stored day, plus a live today."""
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    rows = list(session.exec(_stored_history_query(today)).all())
+    rows.append(_live_today_row(session, today))
+    return rows
+
+
+def _stream_stored_history(bind, today: str, today_row: tuple):
+    """Yield stored history rows in batches off the cursor, then today's.
 
-@router.get("/networth/breakdown")
-def get_networth_breakdown(session: Session = Depends(get_session)):
+    Runs while the response is being sent, so it opens its own session
+    instead of relying on the request's.
+    """
+    with Session(bind) as stream_session:
+        yield from stream_session.exec(
+            _stored_history_query(today).execution_options(yield_per=1000)
+        )
+    yield today_row
+
+
+def _history_ndjson(rows):
+    """Yield history rows as newline-delimited JSON, one point per line."""
+    for date, total_assets, total_liab, net_worth in rows:
+        yield json.dumps({
+            "date": date,
+            "assets": float(total_assets),
+            "liabilities": float(total_liab),
+            "net_worth": float(net_worth),
+        }) + "\n"
+
+
+@router.get("/networth/breakdown", response_model=NetWorthBreakdownResponse)
+def get_networth_breakdown(
+    request: Request,
+    session: Session = Depends(get_session),
+):
     """
     Get detailed breakdown of net worth by category.
     """
+    etag = _networth_etag(session)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    cached = _get_cached_networth("breakdown", etag)
+    if cached is not None:
+        return _json_response(cached, etag)
+
     base_ccy = _get_base_currency(session)
+    rates = rate_table(base_ccy)
 
     # Cash
-    accounts = session.exec(select(Account)).all()
-    acct_balances = get_latest_account_balances(session)
+    accounts = session.exec(_ACCOUNTS_QUERY).all()
     cash_items = []
     total_cash = 0.0
 
     for account in accounts:
-        snap = acct_balances.get(account.id)
-        raw_balance = snap.amount if snap else 0.0
-        balance = _fx(raw_balance, account.currency, base_ccy)
+        balance = _fx(account.current_balance, account.currency, rates)
         total_cash += balance
         cash_items.append({
             "id": account.id,
@@ -261,57 +565,51 @@ def get_networth_breakdown(session: Session = Depends(get_session)):
         })
 
     # Investments
-    holdings = session.exec(select(PortfolioHolding)).all()
-    portfolios = session.exec(select(Portfolio)).all()
-    portfolio_map = {p.id: p for p in portfolios}
+    holding_totals = session.exec(_HOLDING_TOTALS_QUERY).all()
 
     investment_items = []
     total_investments = 0.0
 
     portfolio_values: Dict[int, Dict] = {}
-    for h in holdings:
-        h_ccy = h.currency or "USD"
-        converted = _fx(h.current_value or 0, h_ccy, base_ccy)
-        if h.portfolio_id not in portfolio_values:
-            portfolio_values[h.portfolio_id] = {"value": 0, "holdings": []}
-        portfolio_values[h.portfolio_id]["value"] += converted
-        portfolio_values[h.portfolio_id]["holdings"].append({
-            "ticker": h.ticker,
-            "value": converted,
-            "quantity": h.quantity,
-        })
+    for portfolio_id, h_ccy, value, count, p_name, _p_ccy in holding_totals:
+        converted = _fx(value or 0, h_ccy or "USD", rates)
+        data = portfolio_values.get(portfolio_id)
+        if data is None:
+            data = portfolio_values[portfolio_id] = {"name": p_name, "value": 0, "holdings_count": 0}
+        data["value"] += converted
+        data["holdings_count"] += count
 
     for portfolio_id, data in portfolio_values.items():
-        portfolio = portfolio_map.get(portfolio_id)
         total_investments += data["value"]
         investment_items.append({
             "id": portfolio_id,
-            "name": portfolio.name if portfolio else f"Portfolio {portfolio_id}",
+            "name": data["name"] if data["name"] is not None else f"Portfolio {portfolio_id}",
             "value": data["value"],
-            "holdings_count": len(data["holdings"]),
+            "holdings_count": data["holdings_count"],
         })
 
     # Real Estate
-    properties = session.exec(select(Property)).all()
-    mortgages = session.exec(select(Mortgage)).all()
-
-    prop_currency: Dict[int, str] = {p.id: p.currency for p in properties}
-
-    mortgage_by_property: Dict[int, float] = {}
-    for m in mortgages:
-        if m.is_active:
-            m_ccy = prop_currency.get(m.property_id, "USD")
-            converted = _fx(m.current_balance, m_ccy, base_ccy)
-            if m.property_id not in mortgage_by_property:
-                mortgage_by_property[m.property_id] = 0
-            mortgage_by_property[m.property_id] += converted
+    properties = session.exec(_PROPERTIES_QUERY).all()
+
+    # One pass over mortgages: per-property balances for equity, and the
+    # mortgage rows of the liabilities list
+    mortgage_by_property: Dict[int, float] = defaultdict(float)
+    mortgage_items = []
+    for m_id, prop_id, prop_name, _m_ccy, converted in _converted_mortgages(session, etag, rates):
+        mortgage_by_property[prop_id] += converted
+        mortgage_items.append({
+            "id": f"mortgage_{m_id}",
+            "name": f"Mortgage - {prop_name}",
+            "balance": converted,
+            "category": "mortgage",
+        })
 
     real_estate_items = []
     total_real_estate = 0.0
 
     total_mortgage_balance = 0.0
     for prop in properties:
-        converted_value = _fx(prop.current_value, prop.currency, base_ccy)
+        converted_value = _fx(prop.current_value, prop.currency, rates)
         mortgage_balance = mortgage_by_property.get(prop.id, 0)
         total_mortgage_balance += mortgage_balance
         total_real_estate += converted_value
@@ -325,30 +623,12 @@ def get_networth_breakdown(session: Session = Depends(get_session)):
         })
 
     # Liabilities (including mortgages)
-    liabilities = session.exec(select(Liability)).all()
-    liability_items = []
+    liability_items = mortgage_items
     total_liabilities = total_mortgage_balance  # Start with mortgages
 
-    # Add mortgages to liability items
-    for m in mortgages:
-        if m.is_active:
-            prop = next((p for p in properties if p.id == m.property_id), None)
-            prop_name = prop.name if prop else f"Property {m.property_id}"
-            m_ccy = prop.currency if prop else "USD"
-            converted = _fx(m.current_balance, m_ccy, base_ccy)
-            liability_items.append({
-                "id": f"mortgage_{m.id}",
-                "name": f"Mortgage - {prop_name}",
-                "balance": converted,
-                "category": "mortgage",
-            })
-
     # Add other liabilities
-    liab_balances = get_latest_liability_balances(session)
-    for liab in liabilities:
-        snap = liab_balances.get(liab.id)
-        raw_balance = snap.amount if snap else 0.0
-        balance = _fx(raw_balance, liab.currency, base_ccy)
+    for liab in _liabilities_with_balances(session):
+        balance = _fx(liab.amount or 0.0, liab.currency, rates)
         total_liabilities += balance
         liability_items.append({
             "id": liab.id,
@@ -360,7 +640,7 @@ def get_networth_breakdown(session: Session = Depends(get_session)):
     total_assets = total_cash + total_investments + total_real_estate
     net_worth = total_assets - total_liabilities
 
-    return {
+    body = {
         "net_worth": net_worth,
         "total_assets": total_assets,
         "total_liabilities": total_liabilities,
@@ -384,10 +664,11 @@ def get_networth_breakdown(session: Session = Depends(get_session)):
             },
         }
     }
+    return _cache_json("breakdown", etag, NetWorthBreakdownResponse, body)
 
 
 def _upsert_today_snapshot(
-    session: Session,
+    bind,
     total_cash: float,
     total_investments: float,
     total_real_estate: float,
@@ -395,33 +676,35 @@ def _upsert_today_snapshot(
     total_mortgages: float,
     net_worth: float,
 ) -> None:
-    """Persist today's net worth snapshot (create or update)."""
+    """Persist today's net worth snapshot (create or update).
+
+    Scheduled as a background task, so it opens its own session on ``bind``
+    rather than borrowing the (by then closed) request session.
+
+    A single INSERT ... ON CONFLICT (date) DO UPDATE, so concurrent requests
+    can't race between looking the row up and inserting it. The update only
+    fires when a total actually changed, so repeat dashboard loads leave
+    the row (and its index entries) untouched.
+    """
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    totals = {
+        "total_cash": total_cash,
+        "total_investments": total_investments,
+        "total_real_estate": total_real_estate,
+        "total_liabilities": total_liabilities,
+        "total_mortgages": total_mortgages,
+        "net_worth": net_worth,
+    }
+    dialect_insert = pg_insert if bind.dialect.name == "postgresql" else sqlite_insert
     try:
-        existing = session.exec(
-            select(NetWorthSnapshot).where(NetWorthSnapshot.date == today)
-        ).first()
-
-        if existing:
-            existing.total_cash = total_cash
-            existing.total_investments = total_investments
-            existing.total_real_estate = total_real_estate
-            existing.total_liabilities = total_liabilities
-            existing.total_mortgages = total_mortgages
-            existing.net_worth = net_worth
-            session.add(existing)
-        else:
-            snapshot = NetWorthSnapshot(
-                date=today,
-                total_cash=total_cash,
-                total_investments=total_investments,
-                total_real_estate=total_real_estate,
-                total_liabilities=total_liabilities,
-                total_mortgages=total_mortgages,
-                net_worth=net_worth,
-            )
-            session.add(snapshot)
-
-        session.commit()
+        stmt = dialect_insert(NetWorthSnapshot).values(date=today, **totals)
+        changed = or_(*(
+            getattr(NetWorthSnapshot, column) != stmt.excluded[column] for column in totals
+        ))
+        with Session(bind) as session:
+            session.exec(stmt.on_conflict_do_update(
+                index_elements=["date"], set_=totals, where=changed,
+            ))
+            session.commit()
     except Exception as e:
         logger.warning("Failed to upsert snapshot: %s", e)
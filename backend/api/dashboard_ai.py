@@ -1,13 +1,22 @@
 """
 Dashboard AI API - Cross-domain financial insights and financial stories.
 """
+from dataclasses import dataclass
 from fastapi import APIRouter, Depends
 from sqlmodel import Session, select
-from typing import Optional
+from sqlalchemy import func
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta, timezone
 import time
 
 from core.database import get_session
+from core.queries import (
+    daily_balance_totals,
+    day_key,
+    get_latest_liability_amounts,
+    latest_liability_amounts_subquery,
+    table_etag,
+)
 from models import (
     Account, Liability, BalanceSnapshot, Portfolio, PortfolioHolding,
     Property, Mortgage, Transaction, BudgetCategory, Subscription,
@@ -42,35 +51,83 @@ def load_ai_config(session: Session) -> Optional[str]:
     return api_key
 
 
+@dataclass
+class DashboardData:
+    """Rows the AI dashboard endpoints turn into per-item payloads, loaded once."""
+    accounts: List[Account]
+    holdings: List[PortfolioHolding]
+    properties: List[Property]
+    mortgage_by_prop: Dict[int, float]
+    liabilities: List[Liability]
+
+
+def _load_dashboard_data(session: Session) -> DashboardData:
+    """Read each table once for the per-domain payloads to share."""
+    return DashboardData(
+        accounts=session.exec(select(Account)).all(),
+        holdings=session.exec(select(PortfolioHolding)).all(),
+        properties=session.exec(select(Property)).all(),
+        mortgage_by_prop=dict(session.exec(
+            select(Mortgage.property_id, func.sum(Mortgage.current_balance))
+            .where(Mortgage.is_active == True)
+            .group_by(Mortgage.property_id)
+        ).all()),
+        liabilities=session.exec(select(Liability)).all(),
+    )
+
+
+_NETWORTH_DATA_TTL = 60
+_networth_data_cache: Dict[str, object] = {}
+
+
 def _get_networth_data(session: Session) -> dict:
-    """Build a net worth summary from DB data."""
-    accounts = session.exec(select(Account)).all()
-    total_cash = 0.0
-    for account in accounts:
-        snap = session.exec(
-            select(BalanceSnapshot)
-            .where(BalanceSnapshot.account_id == account.id)
-            .order_by(BalanceSnapshot.date.desc())
-        ).first()
-        total_cash += snap.amount if snap else 0.0
-
-    holdings = session.exec(select(PortfolioHolding)).all()
-    total_investments = sum(h.current_value or 0 for h in holdings)
-
-    properties = session.exec(select(Property)).all()
-    mortgages = session.exec(select(Mortgage)).all()
-    total_real_estate = sum(p.current_value for p in properties)
-    total_mortgages = sum(m.current_balance for m in mortgages if m.is_active)
-
-    liabilities = session.exec(select(Liability)).all()
-    total_other_liab = 0.0
-    for liab in liabilities:
-        snap = session.exec(
-            select(BalanceSnapshot)
-            .where(BalanceSnapshot.liability_id == liab.id)
-            .order_by(BalanceSnapshot.date.desc())
-        ).first()
-        total_other_liab += snap.amount if snap else 0.0
+    """Net worth summary, reused while the tables behind it are unchanged.
+
+    The insights and stories endpoints are usually requested together, so
+    the second call within the TTL skips the sums and only pays for the
+    table ETag check.
+    """
+    etag = table_etag(
+        session, Account, PortfolioHolding, Property, Mortgage, Liability, BalanceSnapshot,
+    )
+    cached = _networth_data_cache
+    if (
+        cached
+        and cached["etag"] == etag
+        and time.time() - cached["fetched_at"] < _NETWORTH_DATA_TTL
+    ):
+        return cached["body"]
+
+    body = _compute_networth_data(session)
+    _networth_data_cache.update(etag=etag, body=body, fetched_at=time.time())
+    return body
+
+
+def _compute_networth_data(session: Session) -> dict:
+    """Build a net worth summary from DB data.
+
+    Every component is a SUM computed by the database, fetched together as
+    scalar subqueries of one SELECT, so only five numbers cross the wire.
+    Account balances come from the denormalized Account.current_balance;
+    liabilities from their newest snapshot.
+    """
+    def total(column, *where):
+        return select(func.coalesce(func.sum(column), 0.0)).where(*where).scalar_subquery()
+
+    latest_liab = latest_liability_amounts_subquery(session)
+    (
+        total_cash,
+        total_investments,
+        total_real_estate,
+        total_mortgages,
+        total_other_liab,
+    ) = session.exec(select(
+        total(Account.current_balance),
+        total(PortfolioHolding.current_value),
+        total(Property.current_value),
+        total(Mortgage.current_balance, Mortgage.is_active == True),
+        total(latest_liab.c.amount),
+    )).one()
 
     total_assets = total_cash + total_investments + total_real_estate
     total_liabilities = total_mortgages + total_other_liab
@@ -89,46 +146,32 @@ def _get_networth_data(session: Session) -> dict:
     }
 
 
+def _get_networth_history(session: Session, points: int = 12) -> List[dict]:
+    """Net worth at the end of each of the last `points` snapshot days."""
+    totals = daily_balance_totals(session)
+    rows = session.exec(
+        select(totals.c.day, totals.c.total_cash - totals.c.total_liabilities)
+        .order_by(totals.c.day.desc())
+        .limit(points)
+    ).all()
+    return [{"date": d, "net_worth": nw} for d, nw in reversed(rows)]
+
+
 @router.get("/dashboard/ai/insights")
 def get_dashboard_insights(session: Session = Depends(get_session)):
     """Get AI-generated cross-domain financial insights for the dashboard."""
     api_key = load_ai_config(session)
 
     # Gather data
+    data = _load_dashboard_data(session)
     networth_data = _get_networth_data(session)
 
     # Net worth history
-    snapshots = session.exec(
-        select(BalanceSnapshot).order_by(BalanceSnapshot.date)
-    ).all()
-    history = []
-    if snapshots:
-        # Simplified history: group by date
-        from collections import defaultdict
-        account_bals = {}
-        liability_bals = {}
-        dates_seen = []
-        for snap in snapshots:
-            date_str = snap.date.strftime("%Y-%m-%d")
-            if snap.account_id:
-                account_bals[snap.account_id] = snap.amount
-            elif snap.liability_id:
-                liability_bals[snap.liability_id] = snap.amount
-            if not dates_seen or dates_seen[-1] != date_str:
-                dates_seen.append(date_str)
-
-        for date_str in dates_seen[-12:]:  # Last 12 points
-            total_a = sum(account_bals.values())
-            total_l = sum(liability_bals.values())
-            history.append({
-                "date": date_str,
-                "net_worth": total_a - total_l,
-            })
+    history = _get_networth_history(session)
 
     # Portfolio data
-    holdings = session.exec(select(PortfolioHolding)).all()
     portfolio_data = []
-    for h in holdings:
+    for h in data.holdings:
         cost_basis = (h.purchase_price or 0) * h.quantity
         current_val = h.current_value or 0
         gain = current_val - cost_basis
@@ -142,17 +185,9 @@ def get_dashboard_insights(session: Session = Depends(get_session)):
         })
 
     # Property data
-    properties = session.exec(select(Property)).all()
-    mortgages = session.exec(select(Mortgage)).all()
-    mortgage_by_prop = {}
-    for m in mortgages:
-        if m.is_active:
-            mortgage_by_prop.setdefault(m.property_id, 0)
-            mortgage_by_prop[m.property_id] += m.current_balance
-
     property_data = []
-    for p in properties:
-        mort_bal = mortgage_by_prop.get(p.id, 0)
+    for p in data.properties:
+        mort_bal = data.mortgage_by_prop.get(p.id, 0)
         property_data.append({
             "name": p.name,
             "current_value": p.current_value,
@@ -161,23 +196,18 @@ def get_dashboard_insights(session: Session = Depends(get_session)):
             "equity": p.current_value - mort_bal,
         })
 
-    # Liability data
-    liabilities = session.exec(select(Liability)).all()
+    # Liability data (latest balances in one batch query)
+    latest_liab = get_latest_liability_amounts(session)
     liability_data = []
-    for liab in liabilities:
-        snap = session.exec(
-            select(BalanceSnapshot)
-            .where(BalanceSnapshot.liability_id == liab.id)
-            .order_by(BalanceSnapshot.date.desc())
-        ).first()
+    for liab in data.liabilities:
         liability_data.append({
             "name": liab.name,
-            "balance": snap.amount if snap else 0,
+            "balance": latest_liab.get(liab.id, 0),
             "category": liab.category,
         })
 
     # Account summary
-    accounts = session.exec(select(Account)).all()
+    accounts = data.accounts
     account_summary = {"count": len(accounts), "types": list(set(a.type for a in accounts))}
 
     # Generate insights
@@ -214,6 +244,7 @@ def get_financial_stories(
         seed = int(datetime.now(timezone.utc).strftime("%Y%m%d"))
 
     # Gather data
+    data = _load_dashboard_data(session)
     networth_data = _get_networth_data(session)
 
     # Budget summary (current month)
@@ -235,7 +266,7 @@ def get_financial_stories(
         }
 
     # Portfolio data
-    holdings = session.exec(select(PortfolioHolding)).all()
+    holdings = data.holdings
     portfolio_data = []
     for h in holdings:
         cost_basis = (h.purchase_price or 0) * h.quantity
@@ -250,17 +281,9 @@ def get_financial_stories(
         })
 
     # Property data
-    properties = session.exec(select(Property)).all()
-    mortgages = session.exec(select(Mortgage)).all()
-    mortgage_by_prop = {}
-    for m in mortgages:
-        if m.is_active:
-            mortgage_by_prop.setdefault(m.property_id, 0)
-            mortgage_by_prop[m.property_id] += m.current_balance
-
     property_data = []
-    for p in properties:
-        mort_bal = mortgage_by_prop.get(p.id, 0)
+    for p in data.properties:
+        mort_bal = data.mortgage_by_prop.get(p.id, 0)
         property_data.append({
             "name": p.name,
             "current_value": p.current_value,
@@ -270,13 +293,14 @@ def get_financial_stories(
     # Recent transactions (last 30 days)
     thirty_days_ago = today - timedelta(days=30)
     recent_txns = session.exec(
-        select(Transaction)
+        select(Transaction.description, Transaction.amount, day_key(session, Transaction.date))
         .where(Transaction.date >= thirty_days_ago)
         .order_by(Transaction.date.desc())
+        .limit(50)
     ).all()
     recent_transactions = [
-        {"description": t.description, "amount": t.amount, "date": t.date.strftime("%Y-%m-%d")}
-        for t in recent_txns[:50]
+        {"description": description, "amount": amount, "date": day}
+        for description, amount, day in recent_txns
     ]
 
     stories = generate_financial_stories(
@@ -292,14 +316,9 @@ def get_financial_stories(
     # Fetch relevant news articles based on portfolio and account signals
     tickers = [h.ticker for h in holdings] if holdings else []
 
-    all_properties = session.exec(select(Property)).all()
-    property_types = list(set(p.property_type for p in all_properties)) if all_properties else []
-
-    all_liabilities = session.exec(select(Liability)).all()
-    liability_categories = list(set(l.category for l in all_liabilities if l.category)) if all_liabilities else []
-
-    all_accounts = session.exec(select(Account)).all()
-    account_types = list(set(a.type for a in all_accounts)) if all_accounts else []
+    property_types = list(set(p.property_type for p in data.properties))
+    liability_categories = list(set(l.category for l in data.liabilities if l.category))
+    account_types = list(set(a.type for a in data.accounts))
 
     news_articles = fetch_relevant_news(
         tickers=tickers,
@@ -2,13 +2,14 @@
 Liabilities API - Full CRUD for debts and liabilities with balance tracking.
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from sqlmodel import Session, delete, select
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime, timezone
 
 from core.database import get_session
-from core.queries import get_latest_liability_balances
+from core.queries import get_latest_liability_amounts, get_latest_liability_balances
 from models import Liability, BalanceSnapshot
 
 router = APIRouter(tags=["Liabilities"])
@@ -55,8 +56,7 @@ class LiabilityResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Liability CRUD
@@ -89,7 +89,7 @@ def create_liability(data: LiabilityCreate, session: Session = Depends(get_sessi
     """Create a new liability with initial balance."""
     # Check for duplicate name
     existing = session.exec(
-        select(Liability).where(Liability.name == data.name)
+        select(Liability.id).where(Liability.name == data.name).limit(1)
     ).first()
     if existing:
         raise HTTPException(status_code=400, detail="Liability with this name already exists")
@@ -102,7 +102,6 @@ def create_liability(data: LiabilityCreate, session: Session = Depends(get_sessi
     )
     session.add(liability)
     session.flush()  # Assigns liability.id without committing
-    session.refresh(liability)
 
     # Create initial balance snapshot
     if data.current_balance != 0:
@@ -133,13 +132,13 @@ def create_liability(data: LiabilityCreate, session: Session = Depends(get_sessi
 def get_liabilities_summary(session: Session = Depends(get_session)):
     """Get aggregate summary of all liabilities."""
     liabilities = session.exec(select(Liability)).all()
-    latest_balances = get_latest_liability_balances(session)
+    latest_balances = get_latest_liability_amounts(session)
 
     total_balance = 0.0
     by_category = {}
 
     for liability in liabilities:
-        balance = latest_balances[liability.id].amount if liability.id in latest_balances else 0.0
+        balance = latest_balances.get(liability.id, 0.0)
         total_balance += balance
 
         # Group by category
@@ -158,16 +157,15 @@ def get_liabilities_summary(session: Session = Depends(get_session)):
 @router.get("/liabilities/{liability_id}")
 def get_liability(liability_id: int, session: Session = Depends(get_session)):
     """Get liability details with balance history."""
-    liability = session.get(Liability, liability_id)
+    liability = session.exec(
+        select(Liability)
+        .options(selectinload(Liability.snapshots))
+        .where(Liability.id == liability_id)
+    ).first()
     if not liability:
         raise HTTPException(status_code=404, detail="Liability not found")
 
-    # Get all balance snapshots
-    snapshots = session.exec(
-        select(BalanceSnapshot)
-        .where(BalanceSnapshot.liability_id == liability_id)
-        .order_by(BalanceSnapshot.date.desc())
-    ).all()
+    snapshots = liability.snapshots
 
     current_balance = snapshots[0].amount if snapshots else 0.0
     last_updated = snapshots[0].date if snapshots else None
@@ -203,7 +201,7 @@ def update_liability(
     if data.name is not None:
         # Check for duplicate name
         existing = session.exec(
-            select(Liability).where(Liability.name == data.name, Liability.id != liability_id)
+            select(Liability.id).where(Liability.name == data.name, Liability.id != liability_id).limit(1)
         ).first()
         if existing:
             raise HTTPException(status_code=400, detail="Liability with this name already exists")
@@ -216,7 +214,6 @@ def update_liability(
         liability.tags = data.tags
 
     liability.updated_at = datetime.now(timezone.utc)
-    session.add(liability)
     session.commit()
     session.refresh(liability)
 
@@ -247,12 +244,12 @@ def delete_liability(liability_id: int, session: Session = Depends(get_session))
     if not liability:
         raise HTTPException(status_code=404, detail="Liability not found")
 
-    # Delete all balance snapshots
-    snapshots = session.exec(
-        select(BalanceSnapshot).where(BalanceSnapshot.liability_id == liability_id)
-    ).all()
-    for snapshot in snapshots:
-        session.delete(snapshot)
+    # Delete all balance snapshots in a single statement. The FK cascades,
+    # but tables created before ON DELETE CASCADE was declared lack it, and
+    # create_all never alters an existing table.
+    session.exec(
+        delete(BalanceSnapshot).where(BalanceSnapshot.liability_id == liability_id)
+    )
 
     session.delete(liability)
     session.commit()
@@ -280,7 +277,6 @@ def update_balance(
     session.add(snapshot)
 
     liability.updated_at = datetime.now(timezone.utc)
-    session.add(liability)
 
     session.commit()
     session.refresh(snapshot)
@@ -1,12 +1,22 @@
 
 import logging
 import os
+import threading
 from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, Body
 from pydantic import BaseModel
 from sqlmodel import Session, select
 from typing import Optional, List
 
+import plaid
+from plaid.api import plaid_api
+from plaid.model.accounts_balance_get_request import AccountsBalanceGetRequest
+from plaid.model.country_code import CountryCode
+from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
+from plaid.model.link_token_create_request import LinkTokenCreateRequest
+from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
+from plaid.model.products import Products
+
 from core.database import get_session
 from models import PlaidItem
 
@@ -15,7 +25,11 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/plaid", tags=["plaid"])
 
 # --- Lazy Plaid client initialization ---
+# One process-wide client, so its urllib3 pool keeps TLS connections to
+# Plaid alive across requests. Sized for concurrent threadpool handlers.
+_PLAID_POOL_MAXSIZE = 32
 _plaid_client = None
+_plaid_client_lock = threading.Lock()
 
 
 def _get_plaid_client():
@@ -23,10 +37,14 @@ def _get_plaid_client():
     global _plaid_client
     if _plaid_client is not None:
         return _plaid_client
+    with _plaid_client_lock:
+        if _plaid_client is None:
+            _plaid_client = _create_plaid_client()
+    return _plaid_client
 
-    import plaid
-    from plaid.api import plaid_api
 
+def _create_plaid_client():
+    """Build the Plaid API client from the PLAID_* environment variables."""
     client_id = os.getenv("PLAID_CLIENT_ID")
     secret = os.getenv("PLAID_SECRET")
     env = os.getenv("PLAID_ENV", "sandbox")
@@ -50,10 +68,12 @@ def _get_plaid_client():
             'secret': secret,
         }
     )
+    # The generated default is 5 per CPU; on small hosts, concurrent calls
+    # beyond the pool open throwaway connections with a fresh TLS handshake.
+    configuration.connection_pool_maxsize = _PLAID_POOL_MAXSIZE
 
     api_client = plaid.ApiClient(configuration)
-    _plaid_client = plaid_api.PlaidApi(api_client)
-    return _plaid_client
+    return plaid_api.PlaidApi(api_client)
 
 # --- Models ---
 class PublicTokenExchangeRequest(BaseModel):
@@ -72,14 +92,8 @@ class AccountBalance(BaseModel):
 # --- Endpoints ---
 
 @router.post("/create_link_token")
-async def create_link_token():
+def create_link_token():
     try:
-        import plaid
-        from plaid.model.link_token_create_request import LinkTokenCreateRequest
-        from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
-        from plaid.model.country_code import CountryCode
-        from plaid.model.products import Products
-
         client = _get_plaid_client()
         request = LinkTokenCreateRequest(
             products=[Products('transactions')],
@@ -96,14 +110,11 @@ async def create_link_token():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/exchange_public_token")
-async def exchange_public_token(
+def exchange_public_token(
     payload: PublicTokenExchangeRequest = Body(...),
     session: Session = Depends(get_session),
 ):
     try:
-        import plaid
-        from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
-
         client = _get_plaid_client()
         request = ItemPublicTokenExchangeRequest(
             public_token=payload.public_token
@@ -134,7 +145,7 @@ async def exchange_public_token(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/balance/{item_id}")
-async def get_balance(item_id: str, session: Session = Depends(get_session)):
+def get_balance(item_id: str, session: Session = Depends(get_session)):
     """Fetch real-time balance for a linked Plaid item. Access token is looked up server-side."""
     # Look up access token from database — never accept it from the client
     plaid_item = session.exec(
@@ -144,9 +155,6 @@ async def get_balance(item_id: str, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Plaid item not found. Link an account first.")
 
     try:
-        import plaid
-        from plaid.model.accounts_balance_get_request import AccountsBalanceGetRequest
-
         client = _get_plaid_client()
         request = AccountsBalanceGetRequest(
             access_token=plaid_item.access_token
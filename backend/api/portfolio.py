@@ -4,7 +4,7 @@ Portfolio API - Full CRUD for portfolios and holdings with P&L calculations.
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime, timezone
 
 from core.database import get_session
@@ -64,8 +64,7 @@ class HoldingResponse(BaseModel):
     gain_percent: Optional[float]
     name: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Portfolio CRUD
@@ -4,7 +4,7 @@ Retirement Plans API - CRUD for saving and managing retirement configurations.
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime, timezone
 
 from core.database import get_session
@@ -38,8 +38,7 @@ class RetirementPlanResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # CRUD endpoints
@@ -68,7 +67,7 @@ def create_plan(data: RetirementPlanCreate, session: Session = Depends(get_sessi
     """Create a new retirement plan."""
     # Check for duplicate name
     existing = session.exec(
-        select(RetirementPlan).where(RetirementPlan.name == data.name)
+        select(RetirementPlan.id).where(RetirementPlan.name == data.name).limit(1)
     ).first()
     if existing:
         raise HTTPException(status_code=400, detail="Plan with this name already exists")
@@ -151,10 +150,10 @@ def update_plan(
     if data.name is not None:
         # Check for duplicate name
         existing = session.exec(
-            select(RetirementPlan).where(
+            select(RetirementPlan.id).where(
                 RetirementPlan.name == data.name,
                 RetirementPlan.id != plan_id
-            )
+            ).limit(1)
         ).first()
         if existing:
             raise HTTPException(status_code=400, detail="Plan with this name already exists")
@@ -19,11 +19,20 @@ from models import (
     NetWorthSnapshot, PlaidItem,
 )
 from services.ai_provider import AIProvider, PROVIDER_CONFIG, resolve_provider
+from api.accounts import invalidate_accounts_summary
+from api.budget import invalidate_categories_cache, seed_default_categories
+from core.queries import refresh_account_balances, table_etag
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Settings"])
 
+# Decrypted setting values, read on nearly every AI/valuation request:
+# {"etag": str, "values": {key: value}}. Keyed on the table's row count and
+# MAX(updated_at), so a read that raced a write stores its values under the
+# old tag and is never served once the write has committed.
+_settings_cache: Optional[dict] = None
+
 
 # Pydantic schemas
 class SettingUpdate(BaseModel):
@@ -184,6 +193,11 @@ def reset_database(
     session.close()
     SQLModel.metadata.drop_all(engine)
     SQLModel.metadata.create_all(engine)
+    invalidate_accounts_summary()
+    invalidate_categories_cache()
+    invalidate_settings_cache()
+    with Session(engine) as fresh:
+        seed_default_categories(fresh)
     logger.info("Database reset: all tables dropped and recreated")
     return {"message": "Database reset successfully. All data has been deleted."}
 
@@ -245,7 +259,12 @@ async def import_data(file: UploadFile = File(...), session: Session = Depends(g
                 logger.warning("Skipping invalid row in %s: %s", key, e)
         imported_counts[key] = count
 
+    # Older exports predate the denormalized balance columns
+    refresh_account_balances(session)
     session.commit()
+    invalidate_accounts_summary()
+    invalidate_categories_cache()
+    invalidate_settings_cache()
     logger.info("Data imported: %s", imported_counts)
     return {"message": "Data imported successfully", "counts": imported_counts}
 
@@ -354,6 +373,7 @@ def update_setting(
     session.add(setting)
     session.commit()
     session.refresh(setting)
+    invalidate_settings_cache()
 
     return {
         "key": key,
@@ -381,20 +401,39 @@ def delete_setting(key: str, session: Session = Depends(get_session)):
         setting.updated_at = datetime.now(timezone.utc)
         session.add(setting)
         session.commit()
+        invalidate_settings_cache()
 
     return {"message": "Setting cleared", "key": key}
 
 
 # Internal helper to get settings (for use by other modules)
 def get_setting_value(session: Session, key: str) -> Optional[str]:
-    """Get the actual (decrypted) value of a setting."""
-    setting = session.exec(
-        select(AppSettings).where(AppSettings.key == key)
-    ).first()
-    if not setting or not setting.value:
-        return None
-    # Decrypt if this is a secret setting
-    meta = KNOWN_SETTINGS.get(key, {})
-    if meta.get("is_secret"):
-        return decrypt_value(setting.value)
-    return setting.value
+    """Get the actual (decrypted) value of a setting.
+
+    All settings are loaded and decrypted together, then served from memory
+    while the settings table's ETag is unchanged.
+    """
+    global _settings_cache
+    etag = table_etag(session, AppSettings)
+    cached = _settings_cache
+    if cached and cached["etag"] == etag:
+        return cached["values"].get(key)
+
+    values = {}
+    for setting in session.exec(select(AppSettings)).all():
+        if not setting.value:
+            continue
+        # Decrypt if this is a secret setting
+        meta = KNOWN_SETTINGS.get(setting.key, {})
+        if meta.get("is_secret"):
+            values[setting.key] = decrypt_value(setting.value)
+        else:
+            values[setting.key] = setting.value
+    _settings_cache = {"etag": etag, "values": values}
+    return values.get(key)
+
+
+def invalidate_settings_cache() -> None:
+    """Drop the cached setting values. Call after committing settings writes."""
+    global _settings_cache
+    _settings_cache = None
@@ -117,7 +117,7 @@ async def parse_bank_statement(
     # Convert parsed transactions to dict format for AI review
     parsed_txns = [
         {
-            "date": txn.date.strftime("%Y-%m-%d"),
+            "date": txn.date.date().isoformat(),
             "description": txn.description,
             "amount": txn.amount,
             "merchant": txn.merchant,
@@ -8,7 +8,18 @@ sqlite_file_name = os.path.join(_backend_dir, "networth_v2.db")
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
 connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
+
+# Size the connection pool for FastAPI's threadpool: the SQLAlchemy default
+# (5 + 10 overflow) makes concurrent requests queue for a connection.
+engine = create_engine(
+    sqlite_url,
+    connect_args=connect_args,
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+)
 
 
 @event.listens_for(engine, "connect")
@@ -8,6 +8,7 @@ is unreachable.
 """
 import logging
 import time
+from functools import lru_cache
 from typing import Dict, Optional
 
 import httpx
@@ -106,6 +107,40 @@ def get_rates() -> Dict[str, float]:
     return FALLBACK_RATES
 
 
+def rates_version() -> Optional[float]:
+    """Timestamp of the cached live rates, or None when none have been fetched.
+
+    Lets callers fold the current rate set into cache keys/ETags.
+    """
+    return _rate_cache["fetched_at"] if _rate_cache else None
+
+
+def rate_table(base_currency: str) -> Dict[str, float]:
+    """Multipliers converting each known currency into ``base_currency``.
+
+    Resolves the rate set once, so a caller converting many amounts pays a
+    dict probe per amount rather than a get_rates() pass (and, when offline,
+    a live-fetch attempt) per conversion. Codes missing from the table
+    convert like USD, as they do in convert().
+    """
+    get_rates()
+    return _rate_table(base_currency, rates_version())
+
+
+@lru_cache(maxsize=32)
+def _rate_table(base_currency: str, version: Optional[float]) -> Dict[str, float]:
+    """Build the table for one base currency and rate set.
+
+    ``version`` is the fetch timestamp of the cached rates, so a refresh
+    produces a new key and stale tables simply age out of the LRU.
+    """
+    rates = _rate_cache["rates"] if _rate_cache else FALLBACK_RATES
+    to_rate = rates.get(base_currency, 1.0)
+    table = {code: to_rate / rate for code, rate in rates.items()}
+    table[base_currency] = 1.0
+    return table
+
+
 def convert(amount: float, from_currency: str, to_currency: str) -> float:
     """Convert an amount between two currencies.
 
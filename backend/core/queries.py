@@ -1,39 +1,154 @@
 """
 Shared query helpers to avoid N+1 patterns.
 """
-from typing import Dict, Optional
-from sqlmodel import Session, select
-from sqlalchemy import func
+import hashlib
+from functools import lru_cache
+from typing import Dict, List
+from sqlmodel import Session, select, update
+from sqlalchemy import case, func
+from sqlalchemy.orm import aliased
 
-from models import BalanceSnapshot
+from models import Account, BalanceSnapshot
 
 
-def get_latest_account_balances(session: Session) -> Dict[int, BalanceSnapshot]:
-    """Get the latest BalanceSnapshot for each account in a single query.
+def table_etag(session: Session, *models, extra: tuple = ()) -> str:
+    """ETag derived from each table's (row count, max updated_at), in one query.
 
-    Returns a dict mapping account_id -> BalanceSnapshot.
+    Inserts and edits move max(updated_at); deletes change the count.
+    Tables without updated_at (append-only ones) use max(created_at).
+    ``extra`` folds in state that lives outside the tables (e.g. FX rates).
+    """
+    columns = []
+    for model in models:
+        stamp = model.updated_at if hasattr(model, "updated_at") else model.created_at
+        columns.append(select(func.count(model.id)).scalar_subquery())
+        columns.append(select(func.max(stamp)).scalar_subquery())
+    values = session.exec(select(*columns)).one()
+    parts = [
+        f"{model.__tablename__}:{values[2 * i]}:{values[2 * i + 1]}"
+        for i, model in enumerate(models)
+    ]
+    parts.extend(str(value) for value in extra)
+    return '"' + hashlib.sha1("|".join(parts).encode()).hexdigest() + '"'
+
+
+def day_key(session: Session, column):
+    """SQL expression formatting a datetime column as 'YYYY-MM-DD'."""
+    if session.get_bind().dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM-DD")
+    return func.strftime("%Y-%m-%d", column)
+
+
+def month_key(session: Session, column):
+    """SQL expression formatting a datetime column as 'YYYY-MM'."""
+    if session.get_bind().dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+def shift_month(year: int, month: int, delta: int) -> tuple:
+    """Return (year, month) moved by ``delta`` calendar months."""
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def daily_balance_totals(session: Session):
+    """Subquery of forward-filled balance totals for each snapshot day.
+
+    Columns: ``day`` ('YYYY-MM-DD'), ``total_cash`` and ``total_liabilities``.
+    Every account/liability keeps its last amount until its next snapshot.
+    Each snapshot contributes its change versus the entity's previous
+    snapshot, and a running sum of those per-day changes gives the totals
+    without walking the snapshots in Python. Callers add ordering/limits.
     """
-    # Subquery: max date per account
-    latest_dates = (
+    previous = func.lag(BalanceSnapshot.amount).over(
+        partition_by=(BalanceSnapshot.account_id, BalanceSnapshot.liability_id),
+        order_by=(BalanceSnapshot.date, BalanceSnapshot.id),
+    )
+    deltas = select(
+        day_key(session, BalanceSnapshot.date).label("day"),
+        BalanceSnapshot.account_id,
+        BalanceSnapshot.liability_id,
+        (BalanceSnapshot.amount - func.coalesce(previous, 0.0)).label("delta"),
+    ).subquery()
+
+    is_account = deltas.c.account_id.isnot(None)
+    is_liability = deltas.c.account_id.is_(None) & deltas.c.liability_id.isnot(None)
+    running_cash = func.sum(
+        func.sum(case((is_account, deltas.c.delta), else_=0.0))
+    ).over(order_by=deltas.c.day)
+    running_liabilities = func.sum(
+        func.sum(case((is_liability, deltas.c.delta), else_=0.0))
+    ).over(order_by=deltas.c.day)
+
+    return (
         select(
-            BalanceSnapshot.account_id,
-            func.max(BalanceSnapshot.date).label("max_date"),
+            deltas.c.day,
+            running_cash.label("total_cash"),
+            running_liabilities.label("total_liabilities"),
         )
-        .where(BalanceSnapshot.account_id.isnot(None))
-        .group_by(BalanceSnapshot.account_id)
+        .group_by(deltas.c.day)
         .subquery()
     )
 
-    # Join to get full snapshot rows
-    snapshots = session.exec(
-        select(BalanceSnapshot)
-        .join(
-            latest_dates,
-            (BalanceSnapshot.account_id == latest_dates.c.account_id)
-            & (BalanceSnapshot.date == latest_dates.c.max_date),
+
+def refresh_account_balances(session: Session) -> None:
+    """Recompute the denormalized Account.current_balance / last_updated.
+
+    Used after bulk changes that bypass the account endpoints (schema
+    upgrade, data import). Does not commit.
+    """
+    def newest(column):
+        return (
+            select(column)
+            .where(BalanceSnapshot.account_id == Account.id)
+            .order_by(BalanceSnapshot.date.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    session.exec(
+        update(Account).values(
+            current_balance=func.coalesce(newest(BalanceSnapshot.amount), 0.0),
+            last_updated=newest(BalanceSnapshot.date),
+        )
+    )
+
+
+def _latest_snapshots(session: Session, owner_column) -> List[BalanceSnapshot]:
+    """Newest BalanceSnapshot per distinct value of ``owner_column``.
+
+    Postgres gets DISTINCT ON, which it answers with a single index scan;
+    other backends (SQLite) use a ROW_NUMBER() window over the same order.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        return session.exec(
+            select(BalanceSnapshot)
+            .where(owner_column.isnot(None))
+            .distinct(owner_column)
+            .order_by(owner_column, BalanceSnapshot.date.desc())
+        ).all()
+
+    ranked = (
+        select(
+            BalanceSnapshot,
+            func.row_number()
+            .over(partition_by=owner_column, order_by=BalanceSnapshot.date.desc())
+            .label("rn"),
         )
-    ).all()
+        .where(owner_column.isnot(None))
+        .subquery()
+    )
+    snapshot = aliased(BalanceSnapshot, ranked)
+    return session.exec(select(snapshot).where(ranked.c.rn == 1)).all()
+
+
+def get_latest_account_balances(session: Session) -> Dict[int, BalanceSnapshot]:
+    """Get the latest BalanceSnapshot for each account in a single query.
 
+    Returns a dict mapping account_id -> BalanceSnapshot.
+    """
+    snapshots = _latest_snapshots(session, BalanceSnapshot.account_id)
     return {s.account_id: s for s in snapshots}
 
 
@@ -42,23 +157,59 @@ def get_latest_liability_balances(session: Session) -> Dict[int, BalanceSnapshot
 
     Returns a dict mapping liability_id -> BalanceSnapshot.
     """
-    latest_dates = (
+    snapshots = _latest_snapshots(session, BalanceSnapshot.liability_id)
+    return {s.liability_id: s for s in snapshots}
+
+
+def latest_liability_amounts_subquery(session: Session):
+    """Subquery of (liability_id, amount) for each liability's newest snapshot.
+
+    Join it onto Liability to read liabilities and their balances in one
+    round trip.
+    """
+    return _latest_liability_amounts_for(session.get_bind().dialect.name)
+
+
+@lru_cache(maxsize=None)
+def _latest_liability_amounts_for(dialect: str):
+    """Build the latest-amount subquery once per dialect.
+
+    SQL constructs are immutable, so sharing one instance lets SQLAlchemy
+    reuse its memoized cache key instead of rebuilding it per request.
+    """
+    owner = BalanceSnapshot.liability_id
+    if dialect == "postgresql":
+        return (
+            select(owner, BalanceSnapshot.amount)
+            .where(owner.isnot(None))
+            .distinct(owner)
+            .order_by(owner, BalanceSnapshot.date.desc())
+            .subquery()
+        )
+
+    ranked = (
         select(
-            BalanceSnapshot.liability_id,
-            func.max(BalanceSnapshot.date).label("max_date"),
+            owner,
+            BalanceSnapshot.amount,
+            func.row_number()
+            .over(partition_by=owner, order_by=BalanceSnapshot.date.desc())
+            .label("rn"),
         )
-        .where(BalanceSnapshot.liability_id.isnot(None))
-        .group_by(BalanceSnapshot.liability_id)
+        .where(owner.isnot(None))
+        .subquery()
+    )
+    return (
+        select(ranked.c.liability_id, ranked.c.amount)
+        .where(ranked.c.rn == 1)
         .subquery()
     )
 
-    snapshots = session.exec(
-        select(BalanceSnapshot)
-        .join(
-            latest_dates,
-            (BalanceSnapshot.liability_id == latest_dates.c.liability_id)
-            & (BalanceSnapshot.date == latest_dates.c.max_date),
-        )
-    ).all()
 
-    return {s.liability_id: s for s in snapshots}
+def get_latest_liability_amounts(session: Session) -> Dict[int, float]:
+    """Latest snapshot amount per liability, without loading full snapshot rows.
+
+    Returns a dict mapping liability_id -> amount. Accounts don't need an
+    equivalent: their latest balance is stored on Account.current_balance.
+    """
+    latest = latest_liability_amounts_subquery(session)
+    return dict(session.exec(select(latest.c.liability_id, latest.c.amount)).all())
@@ -1,6 +1,7 @@
 import logging
 import os
 import sqlite3
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -11,6 +12,10 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
 )
 
+# Sync (def) endpoints run in AnyIO's worker threadpool, which defaults to
+# 40 threads. Raise it so bursts of DB-bound requests don't queue behind it.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "100"))
+
 
 def _ensure_property_columns():
     """Add new columns to existing Property table (SQLite ALTER TABLE)."""
@@ -54,6 +59,35 @@ def _ensure_valuation_cache_columns():
     conn.close()
 
 
+def _ensure_account_balance_columns():
+    """Add denormalized balance columns to Account and backfill them once."""
+    from core.database import sqlite_file_name
+    db_path = sqlite_file_name
+    if not os.path.exists(db_path):
+        return
+    conn = sqlite3.connect(db_path)
+    added = False
+    for col, col_type in [
+        ("current_balance", "FLOAT NOT NULL DEFAULT 0.0"),
+        ("last_updated", "DATETIME"),
+    ]:
+        try:
+            conn.execute(f"ALTER TABLE account ADD COLUMN {col} {col_type}")
+            added = True
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+    conn.commit()
+    conn.close()
+
+    if added:
+        from sqlmodel import Session
+        from core.database import engine
+        from core.queries import refresh_account_balances
+        with Session(engine) as session:
+            refresh_account_balances(session)
+            session.commit()
+
+
 def _ensure_indexes():
     """Create composite indexes on existing tables (idempotent)."""
     from core.database import sqlite_file_name
@@ -62,8 +96,20 @@ def _ensure_indexes():
         return
     conn = sqlite3.connect(db_path)
     for sql in [
-        "CREATE INDEX IF NOT EXISTS ix_balancesnapshot_account_date ON balancesnapshot (account_id, date)",
-        "CREATE INDEX IF NOT EXISTS ix_balancesnapshot_liability_date ON balancesnapshot (liability_id, date)",
+        # Superseded by the partial (owner, date DESC) indexes below
+        "DROP INDEX IF EXISTS ix_balancesnapshot_account_date",
+        "DROP INDEX IF EXISTS ix_balancesnapshot_account_date_desc",
+        "DROP INDEX IF EXISTS ix_balancesnapshot_liability_date",
+        "CREATE INDEX IF NOT EXISTS ix_balancesnapshot_account_latest ON balancesnapshot (account_id, date DESC) WHERE account_id IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS ix_balancesnapshot_liability_latest ON balancesnapshot (liability_id, date DESC) WHERE liability_id IS NOT NULL",
+        # Superseded by the (date, ...) composites below
+        "DROP INDEX IF EXISTS ix_transaction_date",
+        "CREATE INDEX IF NOT EXISTS ix_transaction_date_category ON \"transaction\" (date, category_id)",
+        "CREATE INDEX IF NOT EXISTS ix_transaction_date_amount ON \"transaction\" (date, amount)",
+        "CREATE INDEX IF NOT EXISTS ix_transaction_recurring ON \"transaction\" (is_recurring, recurrence_frequency)",
+        "CREATE INDEX IF NOT EXISTS ix_transaction_category ON \"transaction\" (category_id)",
+        "CREATE INDEX IF NOT EXISTS ix_portfolioholding_portfolio_currency ON portfolioholding (portfolio_id, currency)",
+        "CREATE INDEX IF NOT EXISTS ix_mortgage_active_property ON mortgage (property_id) WHERE is_active = 1",
     ]:
         conn.execute(sql)
     conn.commit()
@@ -72,17 +118,31 @@ def _ensure_indexes():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     # Startup: Create tables
     init_db()
     _ensure_property_columns()
     _ensure_valuation_cache_columns()
+    _ensure_account_balance_columns()
     _ensure_indexes()
+    _seed_default_categories()
     # Create today's net worth snapshot on startup
     _create_startup_snapshot()
     yield
     # Shutdown
 
 
+def _seed_default_categories():
+    """Seed the default budget categories on first run."""
+    from core.database import get_session
+    from api.budget import seed_default_categories
+    session = next(get_session())
+    try:
+        seed_default_categories(session)
+    finally:
+        session.close()
+
+
 def _create_startup_snapshot():
     """Backfill historical snapshots then create/update today's snapshot."""
     from core.database import get_session
@@ -3,6 +3,7 @@ import os
 import sys
 from sqlmodel import Session, select
 from core.database import engine, init_db
+from core.queries import refresh_account_balances
 from models import Account, Liability, Portfolio
 
 # Path to legacy DB (Absolute path so it works even if we move this project)
@@ -207,6 +208,7 @@ def migrate_data():
                             session.add(snap)
                             count += 1
 
+            refresh_account_balances(session)
             session.commit()
             print(f"✓ Migrated {count} balance snapshots")
 
@@ -1,6 +1,6 @@
-from typing import Optional
-from sqlmodel import Field, SQLModel
-from sqlalchemy import Index
+from typing import List, Optional
+from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import Index, desc, text
 from datetime import datetime, timezone
 
 class BaseModel(SQLModel):
@@ -14,8 +14,10 @@ class Account(BaseModel, table=True):
     type: str  # Check/Savings/Investment
     currency: str = Field(default="USD")
     tags: Optional[str] = None
-    
-    # We will add relationships later
+
+    # Denormalized from the newest BalanceSnapshot; maintained on balance writes
+    current_balance: float = Field(default=0.0)
+    last_updated: Optional[datetime] = None
 
 class Liability(BaseModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -24,6 +26,15 @@ class Liability(BaseModel, table=True):
     currency: str = Field(default="USD")
     tags: Optional[str] = None
 
+    # Newest first; eager-load with selectinload on detail reads. The FK
+    # cascades on delete, so the ORM leaves the children to the database.
+    snapshots: List["BalanceSnapshot"] = Relationship(
+        sa_relationship_kwargs={
+            "order_by": "BalanceSnapshot.date.desc()",
+            "passive_deletes": True,
+        }
+    )
+
 class Portfolio(BaseModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True, unique=True)
@@ -32,6 +43,11 @@ class Portfolio(BaseModel, table=True):
     is_active: bool = Field(default=True)
 
 class PortfolioHolding(BaseModel, table=True):
+    __table_args__ = (
+        # Per-portfolio, per-currency value sums (net worth endpoints)
+        Index("ix_portfolioholding_portfolio_currency", "portfolio_id", "currency"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     portfolio_id: int = Field(foreign_key="portfolio.id", ondelete="CASCADE")
     ticker: str
@@ -46,8 +62,19 @@ class PortfolioHolding(BaseModel, table=True):
 # Snapshot table for historical tracking (Normalized!)
 class BalanceSnapshot(BaseModel, table=True):
     __table_args__ = (
-        Index("ix_balancesnapshot_account_date", "account_id", "date"),
-        Index("ix_balancesnapshot_liability_date", "liability_id", "date"),
+        # date DESC matches the newest-first reads, so SQLite skips the sort.
+        # Each snapshot belongs to either an account or a liability, so partial
+        # indexes skip the other half of the table.
+        Index(
+            "ix_balancesnapshot_account_latest", "account_id", desc("date"),
+            sqlite_where=text("account_id IS NOT NULL"),
+            postgresql_where=text("account_id IS NOT NULL"),
+        ),
+        Index(
+            "ix_balancesnapshot_liability_latest", "liability_id", desc("date"),
+            sqlite_where=text("liability_id IS NOT NULL"),
+            postgresql_where=text("liability_id IS NOT NULL"),
+        ),
     )
 
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -131,6 +158,15 @@ class PropertyValueHistory(BaseModel, table=True):
 
 
 class Mortgage(BaseModel, table=True):
+    __table_args__ = (
+        # Net worth only reads active mortgages; paid-off ones stay out of the index
+        Index(
+            "ix_mortgage_active_property", "property_id",
+            sqlite_where=text("is_active = 1"),
+            postgresql_where=text("is_active"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     property_id: int = Field(foreign_key="property.id", ondelete="CASCADE")
     lender: Optional[str] = None
@@ -163,8 +199,19 @@ class BudgetCategory(BaseModel, table=True):
 
 
 class Transaction(BaseModel, table=True):
+    __table_args__ = (
+        # Date-range scans that group by category (budget summary)
+        Index("ix_transaction_date_category", "date", "category_id"),
+        # Date-range scans that only read amount (cash flow sums, expense filters)
+        Index("ix_transaction_date_amount", "date", "amount"),
+        # Forecast filter: equality column first, nullable frequency second
+        Index("ix_transaction_recurring", "is_recurring", "recurrence_frequency"),
+        # Category lookups and the delete_category sweep
+        Index("ix_transaction_category", "category_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    date: datetime = Field(index=True)
+    date: datetime  # Indexed by the date-leading composites above
     description: str
     amount: float  # Positive=income, negative=expense
     category_id: Optional[int] = Field(default=None, foreign_key="budgetcategory.id", ondelete="SET NULL")
@@ -175,6 +222,10 @@ class Transaction(BaseModel, table=True):
     notes: Optional[str] = None
     ai_categorized: bool = Field(default=False)
 
+    # Many-to-one lookups for display names; eager-load with selectinload
+    category: Optional[BudgetCategory] = Relationship()
+    account: Optional[Account] = Relationship()
+
 
 class Subscription(BaseModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -185,6 +236,8 @@ class Subscription(BaseModel, table=True):
     next_billing_date: Optional[datetime] = None
     is_active: bool = Field(default=True)
 
+    category: Optional[BudgetCategory] = Relationship()
+
 
 # Net Worth History (daily snapshots of all components)
 class NetWorthSnapshot(SQLModel, table=True):
@@ -97,11 +97,28 @@ def _retry_with_backoff(func, *args, max_retries: int = MAX_RETRIES, **kwargs):
     raise last_exception
 
 
-def _get_cache_key(description: str, merchant: Optional[str], amount: float) -> str:
-    """Generate a cache key for categorization."""
-    # Normalize the input
-    normalized = f"{description.lower().strip()}|{(merchant or '').lower().strip()}|{amount > 0}"
-    return hashlib.md5(normalized.encode()).hexdigest()
+def _get_cache_key(
+    description: str,
+    merchant: Optional[str],
+    amount: float,
+    available_categories: List[str],
+) -> str:
+    """Generate a cache key for categorization.
+
+    The key covers the normalized transaction, the rounded amount (sign
+    kept separately so small refunds don't collide with small charges),
+    the active provider/model and the category list, so switching models
+    or editing categories never serves a stale answer.
+    """
+    normalized = "|".join((
+        description.lower().strip(),
+        (merchant or "").lower().strip(),
+        "+" if amount > 0 else "-",
+        str(round(abs(amount))),
+        f"{get_active_provider().value}:{get_active_model()}",
+        ",".join(sorted(available_categories)),
+    ))
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
 
 
 def _get_cached_categorization(cache_key: str) -> Optional[Dict]:
@@ -192,7 +209,7 @@ def ai_categorize_transaction(
         Dict with category_name and confidence, or None if AI unavailable/fails
     """
     # Check cache first
-    cache_key = _get_cache_key(description, merchant, amount)
+    cache_key = _get_cache_key(description, merchant, amount, available_categories)
     cached = _get_cached_categorization(cache_key)
     if cached:
         return cached
@@ -255,6 +272,115 @@ Respond with JSON: {{"category": "exact_category_name", "confidence": 0.0-1.0, "
         return None
 
 
+def ai_categorize_transactions_batch(
+    items: List[Dict[str, Any]],
+    available_categories: List[str],
+    api_key: Optional[str] = None,
+    batch_size: int = 50,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Categorize many transactions with one AI request per batch.
+
+    Args:
+        items: Dicts with description, merchant and amount
+        available_categories: Category names the model may choose from
+        api_key: Optional API key override
+        batch_size: Transactions per prompt
+
+    Returns:
+        A list aligned with items; each entry is a dict with category_name
+        and confidence (same shape as ai_categorize_transaction), or None
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+    # Serve what we can from the cache and collapse duplicates so each
+    # distinct transaction is only sent to the model once.
+    pending: Dict[str, List[int]] = {}
+    for i, item in enumerate(items):
+        cache_key = _get_cache_key(
+            item["description"], item.get("merchant"), item["amount"], available_categories
+        )
+        cached = _get_cached_categorization(cache_key)
+        if cached:
+            results[i] = cached
+        else:
+            pending.setdefault(cache_key, []).append(i)
+
+    if not pending:
+        return results
+
+    client = get_ai_client(api_key=api_key)
+    if not client:
+        return results
+
+    system_prompt = """You are a financial transaction categorizer. Your task is to categorize each transaction into one of the provided categories.
+
+Rules:
+- Consider the transaction description, merchant name, and amount
+- Positive amounts are income, negative amounts are expenses
+- Be precise - only use categories from the provided list
+- Return valid JSON only, no other text"""
+
+    keys = list(pending.keys())
+    for batch_start in range(0, len(keys), batch_size):
+        batch_keys = keys[batch_start:batch_start + batch_size]
+
+        txn_list = []
+        for idx, cache_key in enumerate(batch_keys):
+            item = items[pending[cache_key][0]]
+            txn_list.append({
+                "idx": idx,
+                "desc": (item["description"] or "")[:200],
+                "merchant": item.get("merchant") or "Unknown",
+                "amt": item["amount"],
+            })
+
+        user_prompt = f"""Categorize these transactions:
+
+{json.dumps(txn_list, indent=2)}
+
+Available categories: {', '.join(available_categories)}
+
+Return a JSON object with a "results" array, one entry per transaction:
+{{"results": [{{"idx": 0, "category": "exact_category_name", "confidence": 0.0-1.0}}, ...]}}"""
+
+        try:
+            result_text = _make_ai_request(
+                client,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.2,
+                max_tokens=40 * len(batch_keys) + 100,
+                json_mode=True,
+            )
+
+            parsed = _parse_json_response(result_text)
+            ai_results = parsed.get("results", []) if isinstance(parsed, dict) else parsed
+
+            for entry in ai_results:
+                idx = entry.get("idx", entry.get("index"))
+                category = entry.get("category")
+                if not isinstance(idx, int) or not 0 <= idx < len(batch_keys):
+                    continue
+                if not category or category not in available_categories:
+                    continue
+                result = {
+                    "category_name": category,
+                    "confidence": min(1.0, max(0.0, float(entry.get("confidence", 0.8)))),
+                }
+                cache_key = batch_keys[idx]
+                _cache_categorization(cache_key, result)
+                for i in pending[cache_key]:
+                    results[i] = result
+
+        except Exception as e:
+            logger.error(f"AI batch categorization error for batch starting at {batch_start}: {e}")
+
+    return results
+
+
 def generate_spending_insights(
     summary: Dict[str, Any],
     transactions: List[Dict[str, Any]],
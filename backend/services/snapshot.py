@@ -5,33 +5,43 @@ Creates daily snapshots of all net worth components so the history chart
 shows real values instead of projecting today's portfolio/RE backward.
 """
 import logging
+import math
 from datetime import datetime, timezone
 from typing import Dict
 from sqlmodel import Session, select
+from sqlalchemy import func
 
 from models import (
     Account, Liability, BalanceSnapshot, PortfolioHolding,
     Property, Mortgage, NetWorthSnapshot, AppSettings,
 )
-from core.queries import get_latest_account_balances, get_latest_liability_balances
-from core.fx_service import convert_to_base
+from core.queries import daily_balance_totals, latest_liability_amounts_subquery
+from core.fx_service import rate_table
 
 logger = logging.getLogger(__name__)
 
 
+# Built once; runs for every snapshot and net worth history request
+_BASE_CURRENCY_QUERY = select(AppSettings.value).where(AppSettings.key == "default_currency")
+
+
 def _get_base_currency(session: Session) -> str:
     """Get user's base currency from app settings, default USD."""
-    setting = session.exec(
-        select(AppSettings).where(AppSettings.key == "default_currency")
-    ).first()
-    return setting.value if setting and setting.value else "USD"
+    return session.exec(_BASE_CURRENCY_QUERY).first() or "USD"
+
+
+def _fx(amount: float, from_ccy: str, rates: Dict[str, float]) -> float:
+    """Convert amount to base currency using a table from rate_table()."""
+    return amount * rates.get(from_ccy, rates["USD"])
 
 
-def _fx(amount: float, from_ccy: str, base_ccy: str) -> float:
-    """Convert amount to base currency."""
-    if from_ccy == base_ccy:
-        return amount
-    return convert_to_base(amount, from_ccy, base_ccy)
+def _base_total(currency_sums, rates: Dict[str, float]) -> float:
+    """Sum (currency, amount) rows into the base currency.
+
+    fsum keeps the total exact to within one rounding regardless of how
+    many currencies (or how different their magnitudes) are combined.
+    """
+    return math.fsum(_fx(amount or 0, ccy or "USD", rates) for ccy, amount in currency_sums)
 
 
 def compute_net_worth_components(session: Session) -> dict:
@@ -41,44 +51,47 @@ def compute_net_worth_components(session: Session) -> dict:
     Returns a dict with keys matching NetWorthSnapshot fields.
     """
     base_ccy = _get_base_currency(session)
+    rates = rate_table(base_ccy)
 
-    # Cash accounts (batch query)
-    accounts = session.exec(select(Account)).all()
-    acct_ccy = {a.id: a.currency for a in accounts}
-    acct_balances = get_latest_account_balances(session)
-    total_cash = sum(
-        _fx(s.amount, acct_ccy.get(aid, "USD"), base_ccy)
-        for aid, s in acct_balances.items()
-    )
+    # Each component is summed per currency in SQL, so FX is applied once
+    # per currency present rather than once per row (and not at all beyond
+    # a single multiply when everything is already in the base currency).
+
+    # Cash accounts (latest balance is denormalized onto the account row)
+    total_cash = _base_total(session.exec(
+        select(Account.currency, func.sum(Account.current_balance))
+        .group_by(Account.currency)
+    ).all(), rates)
 
     # Investments
-    holdings = session.exec(select(PortfolioHolding)).all()
-    total_investments = sum(
-        _fx(h.current_value or 0, h.currency or "USD", base_ccy) for h in holdings
-    )
+    total_investments = _base_total(session.exec(
+        select(PortfolioHolding.currency, func.sum(PortfolioHolding.current_value))
+        .group_by(PortfolioHolding.currency)
+    ).all(), rates)
 
     # Real estate
-    properties = session.exec(select(Property)).all()
-    total_real_estate = sum(
-        _fx(p.current_value, p.currency, base_ccy) for p in properties
-    )
-
-    # Mortgages (use parent property's currency)
-    prop_ccy = {p.id: p.currency for p in properties}
-    mortgages = session.exec(select(Mortgage)).all()
-    total_mortgages = sum(
-        _fx(m.current_balance, prop_ccy.get(m.property_id, "USD"), base_ccy)
-        for m in mortgages if m.is_active
-    )
-
-    # Other liabilities (batch query)
-    liabilities = session.exec(select(Liability)).all()
-    liab_ccy = {l.id: l.currency for l in liabilities}
-    liab_balances = get_latest_liability_balances(session)
-    total_liabilities = sum(
-        _fx(s.amount, liab_ccy.get(lid, "USD"), base_ccy)
-        for lid, s in liab_balances.items()
-    )
+    total_real_estate = _base_total(session.exec(
+        select(Property.currency, func.sum(Property.current_value))
+        .group_by(Property.currency)
+    ).all(), rates)
+
+    # Active mortgages, held in their parent property's currency
+    total_mortgages = _base_total(session.exec(
+        select(Property.currency, func.sum(Mortgage.current_balance))
+        .select_from(Mortgage)
+        .outerjoin(Property, Property.id == Mortgage.property_id)
+        .where(Mortgage.is_active == True)
+        .group_by(Property.currency)
+    ).all(), rates)
+
+    # Other liabilities: latest amount per liability, in its currency
+    latest = latest_liability_amounts_subquery(session)
+    total_liabilities = _base_total(session.exec(
+        select(Liability.currency, func.sum(latest.c.amount))
+        .select_from(latest)
+        .outerjoin(Liability, Liability.id == latest.c.liability_id)
+        .group_by(Liability.currency)
+    ).all(), rates)
 
     total_assets = total_cash + total_investments + total_real_estate
     total_liab = total_liabilities + total_mortgages
@@ -144,52 +157,23 @@ def backfill_snapshots(session: Session) -> int:
 
     Returns the number of new snapshots created.
     """
-    balance_snaps = session.exec(
-        select(BalanceSnapshot).order_by(BalanceSnapshot.date)
+    totals = daily_balance_totals(session)
+    daily_totals = session.exec(
+        select(totals.c.day, totals.c.total_cash, totals.c.total_liabilities)
+        .order_by(totals.c.day)
     ).all()
 
-    if not balance_snaps:
+    if not daily_totals:
         return 0
 
     # Gather dates that already have a NetWorthSnapshot
-    existing_dates = set(
-        row.date for row in session.exec(select(NetWorthSnapshot)).all()
-    )
+    existing_dates = set(session.exec(select(NetWorthSnapshot.date)).all())
 
-    # Group BalanceSnapshots by date string
-    snaps_by_date: Dict[str, list] = {}
-    for snap in balance_snaps:
-        date_str = snap.date.strftime("%Y-%m-%d")
-        if date_str not in snaps_by_date:
-            snaps_by_date[date_str] = []
-        snaps_by_date[date_str].append(snap)
-
-    # Walk dates chronologically with running balances
-    account_balances: Dict[int, float] = {}
-    liability_balances: Dict[int, float] = {}
     created = 0
-
-    for date_str in sorted(snaps_by_date.keys()):
+    for date_str, total_cash, total_liabilities in daily_totals:
         if date_str in existing_dates:
-            # Still update running balances so subsequent dates are correct
-            for snap in snaps_by_date[date_str]:
-                if snap.account_id:
-                    account_balances[snap.account_id] = snap.amount
-                elif snap.liability_id:
-                    liability_balances[snap.liability_id] = snap.amount
             continue
 
-        # Apply this date's snapshots
-        for snap in snaps_by_date[date_str]:
-            if snap.account_id:
-                account_balances[snap.account_id] = snap.amount
-            elif snap.liability_id:
-                liability_balances[snap.liability_id] = snap.amount
-
-        total_cash = sum(account_balances.values())
-        total_liabilities = sum(liability_balances.values())
-        net_worth = total_cash - total_liabilities
-
         nw_snapshot = NetWorthSnapshot(
             date=date_str,
             total_cash=total_cash,
@@ -197,7 +181,7 @@ def backfill_snapshots(session: Session) -> int:
             total_real_estate=0.0,
             total_liabilities=total_liabilities,
             total_mortgages=0.0,
-            net_worth=net_worth,
+            net_worth=total_cash - total_liabilities,
         )
         session.add(nw_snapshot)
         created += 1